@@ -1,2 +1,27 @@
-from ratesb_python.common.analyzer import Analyzer
-from ratesb_python.common.analyzer import check_model
\ No newline at end of file
+# the public names are imported from their modules on first access, so that importing
+# ratesb_python stays fast, e.g. for command line tools and short-lived worker processes
+_EXPORTS = {
+    "Analyzer": "ratesb_python.common.analyzer",
+    "check_model": "ratesb_python.common.analyzer",
+    "Sandbox": "ratesb_python.common.sandbox",
+    "BatchAnalyzer": "ratesb_python.common.batch",
+    "check_models": "ratesb_python.common.batch",
+    "iter_check_models": "ratesb_python.common.batch",
+    "ResultCache": "ratesb_python.common.result_cache",
+    "AntimonyConverter": "ratesb_python.common.conversion",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,20 +1,27 @@
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-import json
+import itertools
 import sys
 import os
 
 current_dir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
-sys.path.append(current_dir)
-sys.path.append(parent_dir)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
 
 from typing import List, Optional
 from common import util
 from reaction_data import AnalyzerData
+from results import Results, ModelDiff
+from sandbox import Sandbox, classify, compile_library
+from result_cache import ResultCache
+from extraction import SIMPLESBML
+from conversion import AntimonyConverter
 
 import os
 import re
-import sympy as sp
 
 from typing import List
 
@@ -81,7 +88,7 @@ WARNING_CHECKS = []
 for i in range(1, 3):
     ALL_CHECKS.append(i)
     ERROR_CHECKS.append(i)
-for i in range(1001, 1007):
+for i in range(1001, 1008):
     ALL_CHECKS.append(i)
     WARNING_CHECKS.append(i)
 for i in range(1010, 1011):
@@ -96,31 +103,107 @@ for i in range(1030, 1038):
 for i in range(1040, 1045):
     ALL_CHECKS.append(i)
     WARNING_CHECKS.append(i)
-    
-messages_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "messages.json")
-with open(messages_path) as file:
-    MESSAGES = json.load(file)
-
-@dataclass
-class ReactionData:
-    reaction_id: str
-    kinetics: str
-    kinetics_sim: str
-    reactant_list: List[str]
-    product_list: List[str]
-    species_in_kinetic_law: List[str]
-    parameters_in_kinetic_law: List[str]
-    ids_list: List[str]
-    sorted_species: List[str]
-    boundary_species: List[str]
-    parameters_in_kinetic_law_only: List[str]
-    compartment_in_kinetic_law: List[str]
-    is_reversible: bool
-    sbo_term: int
-    codes: List[int]
-    non_constant_params: List[str]
-
-def check_model(model_str: str, rate_law_classifications_path: str=None, abort_on_complicated_rate_laws: bool=True, excluded_codes: List[int]=[]):
+
+
+def __getattr__(name):
+    # the descriptions of the checks are loaded on first use
+    if name == "MESSAGES":
+        return util.get_messages()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# a pseudo-artifact of the checks that read the classifications of the rate law
+CLASSIFICATION = "classification"
+# a pseudo-artifact of the checks that read the requested codes
+CODES = "codes"
+
+
+@dataclass(frozen=True)
+class _Check:
+    """
+    A check of a reaction, the codes it reports and the artifacts it reads. The artifacts
+    are fields of the reaction data, computed on first use, or one of the pseudo-artifacts
+    above.
+    """
+    codes: tuple
+    method: str
+    artifacts: tuple
+
+
+# the checks in the order their messages are reported
+CHECKS = [
+    _Check((1,), "_check_empty_kinetics", ("reaction_id", "kinetics")),
+    _Check((2,), "_check_floating_species",
+           ("reaction_id", "species_in_kinetic_law", "reactant_list", "boundary_species")),
+    _Check((1001,), "_check_pure_number", ("reaction_id", "kinetics_sim")),
+    _Check((1002,), "_check_unrecognized_rate_law", ("reaction_id", CLASSIFICATION)),
+    _Check((1003,), "_check_flux_increasing_with_reactant", ("reaction_id", "reactant_list", "expression")),
+    _Check((1004,), "_check_flux_decreasing_with_product",
+           ("reaction_id", "is_reversible", "product_list", "expression")),
+    _Check((1005,), "_check_boundary_floating_species",
+           ("reaction_id", "species_in_kinetic_law", "reactant_list", "boundary_species")),
+    _Check((1006,), "_check_constant_parameters",
+           ("reaction_id", "parameters_in_kinetic_law_only", "non_constant_params")),
+    _Check((1010,), "_check_irreversibility",
+           ("reaction_id", "species_in_kinetic_law", "product_list", "is_reversible")),
+    _Check((1020, 1021, 1022), "_check_naming_conventions",
+           ("reaction_id", CLASSIFICATION, "numerator_denominator", "parameters_in_kinetic_law_only", CODES)),
+    _Check(tuple(range(1030, 1038)), "_check_formatting_conventions",
+           ("reaction_id", CLASSIFICATION, "kinetics", "ids_list", "sorted_species",
+            "parameters_in_kinetic_law_only", "compartment_in_kinetic_law", CODES)),
+    _Check(tuple(range(1040, 1045)), "_check_sboterm_annotations", ("reaction_id", CLASSIFICATION, "sbo_term", CODES)),
+]
+
+
+def _schedule(codes):
+    """
+    Selects the checks of the requested codes.
+
+    Args:
+        codes (List[int]): List of codes of the checks to perform.
+
+    Returns:
+        (list, bool): The checks to perform, in order, and whether they need the classifications.
+    """
+    codes = set(codes)
+    checks = [check for check in CHECKS if codes.intersection(check.codes)]
+    return checks, any(CLASSIFICATION in check.artifacts for check in checks)
+
+
+# number of shards per worker of a parallel analysis, so that shards of slow rate laws
+# do not leave the other workers idle
+_SHARDS_PER_WORKER = 4
+
+
+def _check_shard(rate_law_classifications_path, time_budget, codes, reactions):
+    """Checks a shard of the reactions of a model, run in a worker process of a parallel analysis.
+
+    Args:
+        rate_law_classifications_path (str): Path to the rate law classification file.
+        time_budget (float): Time budget of each reaction in seconds, None for no limit.
+        codes (List[int]): List of codes of the checks to perform.
+        reactions (List[ReactionData]): The reactions, without the model.
+
+    Returns:
+        list: The outcome of each reaction, as stored in the cache, whether the reaction was
+            checked within its time budget, and whether it is too complex.
+    """
+    analyzer = Analyzer.__new__(Analyzer)
+    analyzer.data = AnalyzerData._detached(rate_law_classifications_path, time_budget)
+    analyzer.results = analyzer.data.results
+    analyzer.workers = 1
+    checks, needs_classification = _schedule(codes)
+    if needs_classification:
+        # workers that are not forked do not inherit the libraries compiled by the parent
+        analyzer._compile_libraries()
+    outcomes = []
+    for data in reactions:
+        is_complete = analyzer._check_within_budget(data, codes, checks, needs_classification)
+        outcomes.append((analyzer._outcome(data.reaction_id), is_complete, data.is_too_complex))
+    return outcomes
+
+
+def check_model(model_str: str, rate_law_classifications_path: str=None, abort_on_complicated_rate_laws: bool=True, excluded_codes: List[int]=[], sandbox: Sandbox=None, cache: ResultCache=None,
+                extraction_backend: str=SIMPLESBML, converter: AntimonyConverter=None, workers: int=1):
     """
     Checks the SBML model for rate law errors and warnings.
 
@@ -129,11 +212,17 @@ def check_model(model_str: str, rate_law_classifications_path: str=None, abort_o
         rate_law_classifications_path (str): Path to the rate law classification file.
         abort_on_complicated_rate_laws (bool): If True, the check will abort if the rate law is too complicated to process.
         excluded_codes (List[int]): List of codes of the checks to exclude. If None, all checks are performed.
+        sandbox (Sandbox): If given, the expensive symbolic stages run in the worker processes of the sandbox.
+        cache (ResultCache): If given, reactions checked before are not checked again.
+        extraction_backend (str): "simplesbml" or "libsbml", the library the reactions are extracted with.
+        converter (AntimonyConverter): If given, an Antimony model is converted in the worker processes of the converter.
+        workers (int): Number of worker processes the reactions of the model are checked on.
 
     Returns:
         The results of the checks as a result object, can be printed or converted to string.
     """
-    analyzer = Analyzer(model_str, rate_law_classifications_path, abort_on_complicated_rate_laws)
+    analyzer = Analyzer(model_str, rate_law_classifications_path, abort_on_complicated_rate_laws, sandbox, cache, extraction_backend,
+                        converter, workers)
     analyzer.check_except(excluded_codes)
     return analyzer.results
 
@@ -176,13 +265,104 @@ class Analyzer:
         if code not in ALL_CHECKS:
             return None
         if code < 1000:
-            ret += MESSAGES["errors"][str(code)]
+            ret += util.get_messages()["errors"][str(code)]
         else:
-            ret += MESSAGES["warnings"][str(code)]
+            ret += util.get_messages()["warnings"][str(code)]
         return ret
         
 
-    def __init__(self, model_str: str, rate_law_classifications_path: str=None, abort_on_complicated_rate_laws: bool=True):
+    @staticmethod
+    def diff(old_model_str: str, new_model_str: str, rate_law_classifications_path: str=None,
+             abort_on_complicated_rate_laws: bool=True, excluded_codes: List[int]=[], sandbox: Sandbox=None,
+             cache: ResultCache=None, extraction_backend: str=SIMPLESBML, converter: AntimonyConverter=None,
+             workers: int=1):
+        """
+        Compares the results of two versions of a model, checking only the reactions that
+        differ. A reaction is unchanged if its stoichiometry and every field the checks read
+        are the same, so its messages are the same in both versions and it is not checked.
+
+        Args:
+            old_model_str (str): Path to the old version of the model, or its string representation.
+            new_model_str (str): Path to the new version of the model, or its string representation.
+            rate_law_classifications_path (str): Path to the rate law classification file.
+            abort_on_complicated_rate_laws (bool): If True, the check will abort if the rate law is too complicated to process.
+            excluded_codes (List[int]): List of codes of the checks to exclude.
+            sandbox (Sandbox): If given, the expensive symbolic stages run in the worker processes of the sandbox.
+            cache (ResultCache): If given, reactions checked before are not checked again.
+            extraction_backend (str): "simplesbml" or "libsbml", the library the reactions are extracted with.
+            converter (AntimonyConverter): If given, Antimony models are converted in the worker processes of the converter.
+            workers (int): Number of worker processes the reactions of each version are checked on.
+
+        Returns:
+            ModelDiff: The added, removed, modified and unchanged reactions, the new and resolved
+                messages, and the messages the modified reactions still get.
+
+        Examples:
+            diff = Analyzer.diff("path/to/old/biomodel.xml", "path/to/new/biomodel.xml")
+            print(diff.new_messages)
+        """
+        old = Analyzer(old_model_str, rate_law_classifications_path, abort_on_complicated_rate_laws, sandbox, cache,
+                       extraction_backend, converter, workers)
+        new = Analyzer(new_model_str, rate_law_classifications_path, abort_on_complicated_rate_laws, sandbox, cache,
+                       extraction_backend, converter, workers)
+        codes = list(set(ALL_CHECKS) - set(excluded_codes))
+        diff = ModelDiff()
+        old_reactions = {data.reaction_id: data for data in old.data.reactions}
+        new_ids = {data.reaction_id for data in new.data.reactions}
+
+        def identity(analyzer, data):
+            # the checks do not read the stoichiometry, but a reaction whose stoichiometry is
+            # edited is modified
+            return data.fingerprint(), analyzer.data._stoichiometry(data.reaction_id)
+
+        # the removed reactions by identity, an added reaction with the same identity is renamed
+        removed = {}
+        for data in old.data.reactions:
+            if data.reaction_id not in new_ids:
+                removed.setdefault(identity(old, data), []).append(data.reaction_id)
+        renamed = set()
+        new_checked = []
+        for data in new.data.reactions:
+            old_data = old_reactions.get(data.reaction_id)
+            if old_data is None:
+                old_ids = removed.get(identity(new, data))
+                if old_ids:
+                    renamed.add(old_ids.pop(0))
+                    diff.unchanged_reactions.append(data.reaction_id)
+                else:
+                    diff.added_reactions.append(data.reaction_id)
+                    new_checked.append(data)
+            elif identity(old, old_data) == identity(new, data):
+                diff.unchanged_reactions.append(data.reaction_id)
+            else:
+                diff.modified_reactions.append(data.reaction_id)
+                new_checked.append(data)
+        modified = set(diff.modified_reactions)
+        old_checked = []
+        for data in old.data.reactions:
+            if data.reaction_id in modified:
+                old_checked.append(data)
+            elif data.reaction_id not in new_ids and data.reaction_id not in renamed:
+                diff.removed_reactions.append(data.reaction_id)
+                old_checked.append(data)
+        old._check_reactions(codes, old_checked)
+        new._check_reactions(codes, new_checked)
+        diff.errors = old.data.errors + new.data.errors
+
+        for data in new_checked:
+            old_messages = old.results.get_messages_by_reaction(data.reaction_id)
+            for message in new.results.get_messages_by_reaction(data.reaction_id):
+                messages = diff.persisting_messages if message in old_messages else diff.new_messages
+                messages.add_message(data.reaction_id, message["code"], message["message"], message["is_warning"])
+        for data in old_checked:
+            new_messages = new.results.get_messages_by_reaction(data.reaction_id) if data.reaction_id in modified else []
+            for message in old.results.get_messages_by_reaction(data.reaction_id):
+                if message not in new_messages:
+                    diff.resolved_messages.add_message(data.reaction_id, message["code"], message["message"], message["is_warning"])
+        return diff
+
+    def __init__(self, model_str: str, rate_law_classifications_path: str=None, abort_on_complicated_rate_laws: bool=True, sandbox: Sandbox=None, cache: ResultCache=None,
+                 extraction_backend: str=SIMPLESBML, converter: AntimonyConverter=None, workers: int=1):
         """
         Initializes the Analyzer class.
 
@@ -190,6 +370,23 @@ class Analyzer:
             model_str (str): Path to the model file, or the string representation of model.
             rate_law_classifications_path (str): Path to the rate law classification file.
             customized rate law classification.
+            abort_on_complicated_rate_laws (bool): If True, a reaction is skipped and reported with
+                code 1007 when processing its rate law takes longer than the time budget.
+            sandbox (Sandbox): If given, the expensive symbolic stages run in the worker processes
+                of the sandbox, and a reaction whose worker exceeds its time or memory limit is
+                reported with code 1007.
+            cache (ResultCache): If given, the check outcomes of a reaction are looked up in the
+                persistent cache, and only the reactions missing from it are checked.
+            extraction_backend (str): "simplesbml" to extract the reactions with SBMLKinetics,
+                "libsbml" to extract the same reactions with libsbml directly, which is faster
+                and uses less memory on large models.
+            converter (AntimonyConverter): If given, an Antimony model is converted to SBML in the
+                worker processes of the converter, which leaves the Antimony state of this process
+                untouched. Conversions are memoized in any case.
+            workers (int): Number of worker processes the reactions are checked on. With more
+                than one worker, the reactions are sent to the workers in shards, without the
+                model, and their results are merged back in the order of the reactions. Cannot
+                be combined with a sandbox.
 
         Examples:
             import Analyzer from ratesb_python.common.analyzer
@@ -199,7 +396,14 @@ class Analyzer:
             print(str(results))
             str(results)
         """
-        self.data = AnalyzerData(model_str, rate_law_classifications_path)
+        if workers < 1:
+            raise ValueError("workers should be at least 1.")
+        if workers > 1 and sandbox is not None:
+            raise ValueError("workers and sandbox cannot be combined.")
+        self.workers = workers
+        self._codes = None
+        self.data = AnalyzerData(model_str, rate_law_classifications_path, abort_on_complicated_rate_laws, sandbox, cache,
+                                 extraction_backend, converter)
         self.results = self.data.results
 
     def check_except(self, excluded_codes: Optional[List[int]]=[]):
@@ -234,53 +438,262 @@ class Analyzer:
         Updates:
             The results of the checks to self.results.
         """
-            
+        return self._check_reactions(codes, self.data.reactions)
+
+    def _check_reactions(self, codes, reactions):
+        # checks the given reactions of the model, in their order
         self.data.default_classifications = {}
         self.data.custom_classifications = {}
         self.data.results.clear_results()
         self.data.errors = []
+        # the codes edited reactions are re-checked with
+        self._codes = list(codes)
         try:
-            for data in self.data.reactions:
-                data.__dict__["codes"] = codes
-                # if any code is related to classification, classify the rate law
-                if any(code in CLASSIFICATION_RELATED_CHECKS for code in codes):
-                    self._set_kinetics_type(**data.__dict__)
-                if 1 in codes:
-                    self._check_empty_kinetics(**data.__dict__)
-                if 2 in codes:
-                    self._check_floating_species(**data.__dict__)
-                if 1001 in codes:
-                    self._check_pure_number(**data.__dict__)
-                if 1002 in codes:
-                    self._check_unrecognized_rate_law(**data.__dict__)
-                if 1003 in codes:
-                    self._check_flux_increasing_with_reactant(**data.__dict__)
-                if 1004 in codes:
-                    self._check_flux_decreasing_with_product(**data.__dict__)
-                if 1005 in codes:
-                    self._check_boundary_floating_species(**data.__dict__)
-                if 1006 in codes:
-                    self._check_constant_parameters(**data.__dict__)
-                if 1010 in codes:
-                    self._check_irreversibility(**data.__dict__)
-                if 1020 in codes or 1021 in codes or 1022 in codes:
-                    self._check_naming_conventions(**data.__dict__)
-                if any(isinstance(num, int) and 1030 <= num <= 1037 for num in codes):
-                    self._check_formatting_conventions(**data.__dict__)
-                if any(isinstance(num, int) and 1040 <= num <= 1044 for num in codes):
-                    self._check_sboterm_annotations(**data.__dict__)
+            checks, needs_classification = _schedule(codes)
+            classifier_digests = self._classifier_digests() if self.data.cache is not None else None
+            if self.workers > 1 and len(reactions) > 1:
+                self._checks_in_parallel(codes, reactions, needs_classification, classifier_digests)
+                return "Success"
+            for data in reactions:
+                self._check_cached(data, codes, checks, needs_classification, classifier_digests)
         except Exception as e:
             self.data.errors.append(str(e))
             return "Error: " + str(e)
         return "Success"
-    
-    def _set_kinetics_type(self, **kwargs):
-        reaction_id = kwargs["reaction_id"]
-        self.data.default_classifications[reaction_id] = self.data.default_classifier.custom_classify(
-            is_default=True, **kwargs)
+
+    def update_reaction(self, reaction_id: str, kinetics: str):
+        """
+        Replaces the kinetic law of a reaction, and re-checks that reaction only with the codes
+        of the last checks. The results of the other reactions are kept, so the cost of an
+        edit does not grow with the size of the model.
+
+        Args:
+            reaction_id (str): The id of the reaction.
+            kinetics (str): The new kinetic law, in SBML Level 3 infix syntax.
+
+        Updates:
+            The results of the reaction in self.results.
+        """
+        self._recheck_reaction(self.data.update_reaction(reaction_id, kinetics))
+
+    def add_reaction(self, reaction_id: str, reactant_list: List[str], product_list: List[str], kinetics: str,
+                     is_reversible: bool=False):
+        """
+        Adds a reaction to the end of the model, and checks that reaction only with the codes
+        of the last checks.
+
+        Args:
+            reaction_id (str): The id of the reaction.
+            reactant_list (List[str]): The ids of the reactant species.
+            product_list (List[str]): The ids of the product species.
+            kinetics (str): The kinetic law, in SBML Level 3 infix syntax.
+            is_reversible (bool): Whether the reaction is reversible.
+
+        Updates:
+            The results of the reaction in self.results.
+        """
+        self._recheck_reaction(self.data.add_reaction(reaction_id, reactant_list, product_list, kinetics, is_reversible))
+
+    def remove_reaction(self, reaction_id: str):
+        """
+        Removes a reaction from the model, along with its results.
+
+        Args:
+            reaction_id (str): The id of the reaction.
+
+        Updates:
+            The results of the reaction are removed from self.results.
+        """
+        self.data.remove_reaction(reaction_id)
+        self.data.results.remove_messages_by_reaction(reaction_id)
+        self.data.default_classifications.pop(reaction_id, None)
+        self.data.custom_classifications.pop(reaction_id, None)
+
+    def _recheck_reaction(self, index):
+        data = self.data.reactions[index]
+        reaction_id = data.reaction_id
+        self.data.default_classifications.pop(reaction_id, None)
+        self.data.custom_classifications.pop(reaction_id, None)
+        if self._codes is None:
+            # not checked yet, the reaction is checked with the others
+            return
+        # the checks add the messages of the reaction to fresh results, which then replace
+        # its messages in place
+        results = self.data.results
+        self.data.results = Results()
+        try:
+            checks, needs_classification = _schedule(self._codes)
+            classifier_digests = self._classifier_digests() if self.data.cache is not None else None
+            self._check_cached(data, self._codes, checks, needs_classification, classifier_digests)
+            messages = self.data.results.get_messages_by_reaction(reaction_id)
+        finally:
+            self.data.results = results
+        next_reaction_names = (data.reaction_id for data in itertools.islice(self.data.reactions, index + 1, None))
+        results.replace_messages_by_reaction(reaction_id, messages, next_reaction_names)
+
+    def _check_cached(self, data, codes, checks, needs_classification, classifier_digests):
+        # checks a reaction, unless its outcome is in the cache
+        data.codes = codes
+        key = None
+        if self.data.cache is not None:
+            key = self.data.cache.key(data, codes, classifier_digests)
+            outcome = self.data.cache.get(key)
+            if outcome is not None:
+                self._restore_outcome(data.reaction_id, outcome)
+                return
+        if needs_classification:
+            # the classification libraries are compiled for the first reaction that is not cached
+            self._compile_libraries()
+        if self._check_within_budget(data, codes, checks, needs_classification) and key is not None:
+            self.data.cache.put(key, self._outcome(data.reaction_id))
+
+    def _checks_in_parallel(self, codes, reactions, needs_classification, classifier_digests):
+        # the reactions are checked in shards on worker processes, which get the reactions
+        # without the model, and their outcomes are merged back in the order of the reactions
+        outcomes = [None] * len(reactions)
+        keys = [None] * len(reactions)
+        misses = []
+        for index, data in enumerate(reactions):
+            data.codes = codes
+            if self.data.cache is not None:
+                keys[index] = self.data.cache.key(data, codes, classifier_digests)
+                outcomes[index] = self.data.cache.get(keys[index])
+                if outcomes[index] is not None:
+                    continue
+            # the fields read from the model are computed before the reaction leaves the process
+            data.boundary_species
+            data.non_constant_params
+            misses.append(index)
+        if misses:
+            if needs_classification:
+                # workers forked afterwards share the compiled libraries
+                self._compile_libraries()
+            custom_path = self.data.custom_classifier.rate_law_classifications_path if self.data.custom_classifier else None
+            num_shards = min(len(misses), self.workers * _SHARDS_PER_WORKER)
+            shards = [misses[i * len(misses) // num_shards:(i + 1) * len(misses) // num_shards] for i in range(num_shards)]
+            with ProcessPoolExecutor(max_workers=min(self.workers, num_shards)) as executor:
+                futures = [executor.submit(_check_shard, custom_path, self.data.time_budget, codes,
+                                           [reactions[index] for index in shard]) for shard in shards]
+                for shard, future in zip(shards, futures):
+                    for index, (outcome, is_complete, is_too_complex) in zip(shard, future.result()):
+                        outcomes[index] = outcome
+                        reactions[index].is_too_complex = is_too_complex
+                        if outcome["default_classification"] is not None:
+                            reactions[index].classifications = (self._classifier_digests(), outcome["default_classification"],
+                                                                outcome["custom_classification"])
+                        if is_complete and keys[index] is not None:
+                            self.data.cache.put(keys[index], outcome)
+        for data, outcome in zip(reactions, outcomes):
+            self._restore_outcome(data.reaction_id, outcome)
+
+    def _check_within_budget(self, data, codes, checks, needs_classification):
+        # returns False if the reaction is too complex, its outcome is then not cached
+        try:
+            if data.is_too_complex:
+                raise util.RateLawTimeout()
+            with util.time_limit(self.data.time_budget):
+                self._check_reaction(data, codes, checks, needs_classification)
+        except util.RateLawTimeout:
+            self._check_too_complex(reaction_id=data.reaction_id, codes=codes)
+            return False
+        return True
+
+    def _compile_libraries(self):
+        # the classification libraries are not part of the time budget of any reaction,
+        # a sandbox compiles them in its workers
+        if self.data.sandbox:
+            return
+        self.data.default_classifier.compile_library()
+        if self.data.custom_classifier:
+            self.data.custom_classifier.compile_library()
+
+    def _classifier_digests(self):
+        digests = [self.data.default_classifier.library.digest]
         if self.data.custom_classifier:
-            self.data.custom_classifications[reaction_id] = self.data.custom_classifier.custom_classify(
-                **kwargs)
+            digests.append(self.data.custom_classifier.library.digest)
+        return digests
+
+    def _outcome(self, reaction_id):
+        # the messages and classifications of a reaction, as stored in the cache
+        return {
+            "messages": self.data.results.get_messages_by_reaction(reaction_id),
+            "default_classification": self.data.default_classifications.get(reaction_id),
+            "custom_classification": self.data.custom_classifications.get(reaction_id),
+        }
+
+    def _restore_outcome(self, reaction_id, outcome):
+        for message in outcome["messages"]:
+            self.data.results.add_message(reaction_id, message["code"], message["message"], message["is_warning"])
+        if outcome["default_classification"] is not None:
+            self.data.default_classifications[reaction_id] = outcome["default_classification"]
+        if outcome["custom_classification"] is not None:
+            self.data.custom_classifications[reaction_id] = outcome["custom_classification"]
+
+    def _check_reaction(self, data, codes, checks, needs_classification):
+        # every check only gets the artifacts it reads, so that the lazy fields of the
+        # reaction are only computed when a requested check needs them
+        if needs_classification:
+            self._set_kinetics_type(data)
+        for check in checks:
+            kwargs = {}
+            for artifact in check.artifacts:
+                if artifact == CODES:
+                    kwargs[artifact] = codes
+                elif artifact != CLASSIFICATION:
+                    kwargs[artifact] = getattr(data, artifact)
+            getattr(self, check.method)(**kwargs)
+
+    def _check_too_complex(self, **kwargs):
+        """
+        Skips a reaction whose rate law exceeded its time or memory budget.
+        Code: 1007
+
+        Args:
+            reaction_id (str): The reaction's id'.
+            codes (list): The codes of the checks to perform.
+
+        Adds:
+            A warning message to results specifying that the rate law is too complex, in place of
+            the messages of the other checks of the reaction.
+        """
+        reaction_id = kwargs["reaction_id"]
+        codes = kwargs["codes"]
+        self.data.results.remove_messages_by_reaction(reaction_id)
+        self.data.default_classifications.pop(reaction_id, None)
+        self.data.custom_classifications.pop(reaction_id, None)
+        if 1007 in codes:
+            self.data.results.add_message(
+                reaction_id, 1007, "Rate law is too complex to process within the time or memory limit, other checks are skipped.")
+    
+    def _set_kinetics_type(self, data):
+        reaction_id = data.reaction_id
+        # the classifications only depend on the reaction and the classification libraries, they
+        # are reused by later checks until the reaction is edited or a library changes
+        classifier_digests = self._classifier_digests()
+        if data.classifications is not None and data.classifications[0] == classifier_digests:
+            _, default_classification, custom_classification = data.classifications
+        else:
+            kwargs = {
+                "reaction_id": reaction_id, "kinetics": data.kinetics, "kinetics_expression": data.expression.expr,
+                "reactant_list": data.reactant_list, "product_list": data.product_list,
+                "species_in_kinetic_law": data.species_in_kinetic_law,
+                "parameters_in_kinetic_law_only": data.parameters_in_kinetic_law_only,
+                "compartment_in_kinetic_law": data.compartment_in_kinetic_law,
+            }
+            default_classification = self._classify(self.data.default_classifier, True, kwargs)
+            custom_classification = None
+            if self.data.custom_classifier:
+                custom_classification = self._classify(self.data.custom_classifier, False, kwargs)
+            data.classifications = (classifier_digests, default_classification, custom_classification)
+        self.data.default_classifications[reaction_id] = default_classification
+        if custom_classification is not None:
+            self.data.custom_classifications[reaction_id] = custom_classification
+
+    def _classify(self, classifier, is_default, kwargs):
+        if not self.data.sandbox:
+            return classifier.custom_classify(is_default=is_default, **kwargs)
+        path = classifier.rate_law_classifications_path
+        return self.data.sandbox.run(classify, path, is_default, kwargs, setup=(compile_library, (path,)))
 
     def _check_empty_kinetics(self, **kwargs):
         """
@@ -347,7 +760,7 @@ class Analyzer:
             float(kinetics_sim)
             self.data.results.add_message(
                 reaction_id, 1001, "Rate law contains only number.")
-        except:
+        except Exception:
             return
 
     def _check_unrecognized_rate_law(self, **kwargs):
@@ -379,18 +792,18 @@ class Analyzer:
         Args:
             reaction_id (str): The reaction's id'.
             reactant_list (str): List of reactants in reaction
-            kinetics (str): the kinetic law
+            expression (RateLawExpression): the parsed kinetic law
 
         Adds:
             A warning message to results specifying if the flux is not increasing as reactant increases.
         """
         reaction_id = kwargs["reaction_id"]
-        ids_list = kwargs["ids_list"]
         reactant_list = kwargs["reactant_list"]
-        kinetics = kwargs["kinetics"]
-        
+        expression = kwargs["expression"]
 
-        if not util.check_kinetics_derivative(kinetics, ids_list, reactant_list):
+        if expression.compiled is None:
+            raise ValueError("Invalid kinetics: " + expression.kinetics)
+        if not util.check_compiled_derivative(expression.compiled, reactant_list):
             self.data.results.add_message(
                 reaction_id, 1003, "Flux is not increasing as reactant increases.")
 
@@ -403,24 +816,23 @@ class Analyzer:
             reaction_id (str): The reaction's id'.
             is_reversible (bool): the reaction's reversibility
             product_list (list): List of products in reaction
-            kinetics (str): the kinetic law
+            expression (RateLawExpression): the parsed kinetic law
 
         Adds:
             A warning message to results specifying if the flux is not decreasing as product increases.
         """
         reaction_id = kwargs["reaction_id"]
-        ids_list = kwargs["ids_list"]
         is_reversible = kwargs["is_reversible"]
         product_list = kwargs["product_list"]
-        kinetics = kwargs["kinetics"]
+        expression = kwargs["expression"]
         
-        # first check if kinetics can be sympified, TODO: support functions in MathML 
-        if is_reversible:
+        # skip kinetics that cannot be parsed or evaluated, TODO: support functions in MathML 
+        if is_reversible and expression.compiled is not None:
             try:
-                if not util.check_kinetics_derivative(kinetics, ids_list, product_list, is_positive_derivative=False):
+                if not util.check_compiled_derivative(expression.compiled, product_list, is_positive_derivative=False):
                     self.data.results.add_message(
                         reaction_id, 1004, "Flux is not decreasing as product increases.")
-            except:
+            except Exception:
                 return
 
     def _check_boundary_floating_species(self, **kwargs):
@@ -513,38 +925,38 @@ class Analyzer:
 
         Args:
             reaction_id (str): The reaction's id'.
+            numerator_denominator (tuple): the numerator and denominator of the simplified kinetic law,
+                None if it cannot be parsed
+            parameters_in_kinetic_law_only (list): the parameters in kinetic law
 
         Adds:
             A warning message to results specifying that certain parameters in the rate law are not following the recommended naming convention.
         """
         reaction_id = kwargs["reaction_id"]
         parameters_in_kinetic_law_only = kwargs["parameters_in_kinetic_law_only"]
-        kinetics_sim = kwargs["kinetics_sim"]
-        ids_list = kwargs["ids_list"]
+        numerator_denominator = kwargs["numerator_denominator"]
         codes = kwargs["codes"]
 
         naming_convention_warnings = {'k': [], 'K': [], 'V': []}
+        if numerator_denominator is None:
+            numerator_symbols, denominator_symbols = set(), set()
+        else:
+            numerator_symbols = {str(symbol) for symbol in numerator_denominator[0].free_symbols}
+            denominator_symbols = {str(symbol) for symbol in numerator_denominator[1].free_symbols}
+        eq0 = [param for param in parameters_in_kinetic_law_only if param in numerator_symbols]
+        eq1 = [param for param in parameters_in_kinetic_law_only if param in denominator_symbols]
         if any(self.data.default_classifications[reaction_id][key] for key in NON_MM_KEYS):
             naming_convention_warnings['k'] = self._check_symbols_start_with(
                 'k', parameters_in_kinetic_law_only)
         elif self.data.default_classifications[reaction_id]['MM']:
-            eq = self._numerator_denominator(kinetics_sim, ids_list)
-            eq0 = [param for param in parameters_in_kinetic_law_only if param in eq[0]]
-            eq1 = [param for param in parameters_in_kinetic_law_only if param in eq[1]]
             naming_convention_warnings['V'] = self._check_symbols_start_with(
                 'V', eq0)
             naming_convention_warnings['K'] = self._check_symbols_start_with(
                 'K', eq1)
         elif self.data.default_classifications[reaction_id]['MMcat']:
-            eq = self._numerator_denominator(kinetics_sim, ids_list)
-            eq0 = [param for param in parameters_in_kinetic_law_only if param in eq[0]]
-            eq1 = [param for param in parameters_in_kinetic_law_only if param in eq[1]]
             naming_convention_warnings['K'] = self._check_symbols_start_with('K', eq0)
             naming_convention_warnings['K'] = self._check_symbols_start_with('K', eq1)
         elif self.data.default_classifications[reaction_id]['Hill']:
-            eq = self._numerator_denominator(kinetics_sim, ids_list)
-            eq0 = [param for param in parameters_in_kinetic_law_only if param in eq[0]]
-            eq1 = [param for param in parameters_in_kinetic_law_only if param in eq[1]]
             naming_convention_warnings['K'] = self._check_symbols_start_with(
                 'K', eq1)
 
@@ -571,58 +983,6 @@ class Analyzer:
                 ret.append(symbol)
         return ret
 
-    def _numerator_denominator(self, kinetics_sim, ids_list):
-        """
-        Get the numerator and denominator of a "fraction" function.
-
-        Parameters
-        ----    
-        kinetics_sim: string-simplified kinetics
-        ids_list: list-id list including all the ids in kinetics, reactants and products
-
-        Returns
-        -------
-        Type - the numerator and the denominator of the fraction
-        """
-
-        strange_func = 0
-        pre_symbols = ''
-        ids_with_underscore = []
-        kinetics_with_underscore = util.add_underscore_to_ids(ids_list, kinetics_sim, ids_with_underscore)
-        for i in range(len(ids_with_underscore)):
-            pre_symbols += ids_with_underscore[i]
-            pre_symbols += ' '
-        pre_symbols = pre_symbols[:-1]  # remove the space at the end
-        pre_symbols_comma = pre_symbols.replace(" ", ",")
-        stmt = "%s = sp.symbols('%s')" % (pre_symbols_comma, pre_symbols)
-        try:  # sometimes there is "invalid syntax error"
-            exec(stmt, globals())
-        except:
-            strange_func = 1
-
-        try:  # check if there is strange func (i.e. delay) in kinetic law;
-            # sometimes ids_list is not enough for all the ids in kinetics
-            eq_stat = "kinetics_eq = " + kinetics_with_underscore
-            exec(eq_stat, globals())
-        except:
-            strange_func = 1
-
-        eq = ['', '']
-
-        if strange_func == 0:
-            try:
-                numerator = str(kinetics_eq.as_numer_denom()[0])
-                denominator = str(kinetics_eq.as_numer_denom()[1])
-                eq[0] = numerator
-                eq[1] = denominator
-            except:
-                pass
-        
-        eq[0] = util.remove_underscore_from_ids(ids_list, eq[0])
-        eq[1] = util.remove_underscore_from_ids(ids_list, eq[1])
-
-        return eq
-
     def _numerator_denominator_order_remained(self, kinetics, ids_list):
         # Split the fraction at the '/' character
         split_fraction = kinetics.split('/')
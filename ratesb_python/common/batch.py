@@ -0,0 +1,373 @@
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import glob
+import sys
+import os
+import zipfile
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from typing import Iterable, List, Union
+from analyzer import Analyzer
+from result_cache import ResultCache
+from extraction import SIMPLESBML
+import model_files
+from conversion import AntimonyConverter
+
+# the error of models whose worker process died, e.g. in native code
+_BROKEN_WORKER_MESSAGE = "The worker process checking the model terminated abruptly."
+
+
+def _iter_models(source):
+    """Lists the models of a source lazily. Every model of an archive is listed, one entry
+    is decompressed at a time.
+
+    Args:
+        source (str or Iterable[str]): A directory, a glob pattern, an archive, or an
+            iterable of paths to model files or archives or string representations of models.
+
+    Yields:
+        (str, str): The id of the model and the model, a path or the model string. The id of
+            a model in a zip or COMBINE archive is the archive path joined with the entry name.
+    """
+    if not isinstance(source, str):
+        for model_str in source:
+            yield from _expand_archive(model_str)
+    elif os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if os.path.isfile(path) and not name.startswith("."):
+                yield from _expand_archive(path)
+    elif os.path.isfile(source):
+        yield from _expand_archive(source)
+    else:
+        paths = sorted(glob.glob(source))
+        if not paths:
+            raise ValueError(f"No models found in {source}.")
+        for path in paths:
+            yield from _expand_archive(path)
+
+
+def _expand_archive(model_str):
+    """Lists the models of a zip or COMBINE archive, or else the given model.
+
+    Args:
+        model_str (str): Path to the model file or archive, or the string representation of a model.
+
+    Yields:
+        (str, str): The id of the model and the model.
+    """
+    if model_files.is_path(model_str) and model_files.is_archive(model_str) and zipfile.is_zipfile(model_str):
+        for name, entry in model_files.iter_archive_models(model_str):
+            yield os.path.join(model_str, name), entry
+    else:
+        # a gzip archive holds one model, the analyzer decompresses it
+        yield model_str, model_str
+
+
+def _prefetch_conversions(models, converter, window):
+    """Converts the Antimony models of a source in the workers of a converter, a few models
+    ahead of the ones being checked, and substitutes the converted SBML models.
+
+    Args:
+        models (Iterable): The (model id, model) pairs of _iter_models.
+        converter (AntimonyConverter): The converter.
+        window (int): Number of models converted ahead.
+
+    Yields:
+        (str, str): The id of the model and the model, the SBML model if it was converted.
+    """
+    ahead = deque()
+    for model_id, model_str in models:
+        ahead.append((model_id, model_str, _submit_conversion(converter, model_str)))
+        if len(ahead) > window:
+            yield _converted_model(*ahead.popleft())
+    while ahead:
+        yield _converted_model(*ahead.popleft())
+
+
+def _submit_conversion(converter, model_str):
+    if model_files.is_path(model_str):
+        if model_files.is_archive(model_str) or model_files.is_sbml_file(model_str):
+            return None
+        with open(model_str, encoding='utf-8') as file:
+            return converter.submit(file.read())
+    if '<?xml' in model_str or model_str.lstrip().startswith('<') or model_str.endswith(model_files.MODEL_EXTENSIONS):
+        return None
+    return converter.submit(model_str)
+
+
+def _converted_model(model_id, model_str, future):
+    if future is not None:
+        try:
+            xml = future.result()
+        except BrokenProcessPool:
+            xml = None
+        # a model that cannot be converted is passed on as is, its error is reported by the analyzer
+        if xml is not None:
+            return model_id, xml
+    return model_id, model_str
+
+
+def _check_model(task):
+    """Checks one model, run in a worker process of the batch.
+
+    Args:
+        task (tuple): The model, the rate law classification file, whether to abort on
+            complicated rate laws, the codes to exclude, the result cache and the extraction backend.
+
+    Returns:
+        (bool, Results or str): True and the results of the model, or False and the error
+            message if the model could not be analyzed.
+    """
+    model_str, rate_law_classifications_path, abort_on_complicated_rate_laws, excluded_codes, cache, extraction_backend = task
+    try:
+        analyzer = Analyzer(model_str, rate_law_classifications_path, abort_on_complicated_rate_laws, cache=cache,
+                            extraction_backend=extraction_backend)
+        analyzer.check_except(excluded_codes)
+    except Exception as e:
+        return False, str(e)
+    if analyzer.data.errors:
+        return False, analyzer.data.errors[0]
+    return True, analyzer.results
+
+
+def _check_chunk(tasks):
+    """Checks a chunk of models, run in a worker process of the batch.
+
+    Args:
+        tasks (list): The tasks of _check_model.
+
+    Returns:
+        list: The outcomes of _check_model.
+    """
+    return [_check_model(task) for task in tasks]
+
+
+def _shutdown(executor, futures, wait):
+    """Cancels the tasks that have not started and stops the workers of an executor.
+
+    Args:
+        executor (ProcessPoolExecutor): The executor.
+        futures (list): The futures of the tasks in flight.
+        wait (bool): If True, waits for the running tasks to finish.
+    """
+    # Executor.shutdown only cancels the pending tasks itself from Python 3.9
+    for future in futures:
+        future.cancel()
+    executor.shutdown(wait=wait)
+
+
+class BatchAnalyzer:
+    """
+    Checks a corpus of models on a pool of worker processes. A model that cannot be
+    analyzed does not stop the batch, its error message is recorded instead of its results.
+    The results are in the order of the given models, regardless of the order in which
+    the workers finish them. A model whose worker process terminates abruptly, e.g. in
+    native code, fails alone, the other models in flight are checked again.
+
+    Examples:
+        batch = BatchAnalyzer(workers=8)
+        results = batch.check_models(["path/to/biomodel1.xml", "path/to/biomodel2.xml"])
+        print(batch.errors)
+    """
+
+    def __init__(self, rate_law_classifications_path: str=None, abort_on_complicated_rate_laws: bool=True,
+                 workers: int=None, chunksize: int=1, cache: ResultCache=None, extraction_backend: str=SIMPLESBML,
+                 converter: AntimonyConverter=None):
+        """
+        Initializes the BatchAnalyzer class.
+
+        Args:
+            rate_law_classifications_path (str): Path to the rate law classification file.
+            abort_on_complicated_rate_laws (bool): If True, the check will abort if the rate law is too complicated to process.
+            workers (int): Number of worker processes, the number of CPUs if None. With one
+                worker the models are checked in the calling process.
+            chunksize (int): Number of models sent to a worker at a time.
+            cache (ResultCache): If given, reactions checked before are not checked again. The
+                workers share the cache file.
+            extraction_backend (str): "simplesbml" or "libsbml", the library the reactions are extracted with.
+            converter (AntimonyConverter): If given, the Antimony models are converted to SBML in
+                the workers of the converter, ahead of the models being checked.
+        """
+        if workers is not None and workers < 1:
+            raise ValueError("workers should be at least 1.")
+        if chunksize < 1:
+            raise ValueError("chunksize should be at least 1.")
+        self.rate_law_classifications_path = rate_law_classifications_path
+        self.abort_on_complicated_rate_laws = abort_on_complicated_rate_laws
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.cache = cache
+        self.extraction_backend = extraction_backend
+        self.converter = converter
+        self.results = OrderedDict()
+        self.errors = OrderedDict()
+
+    def check_models(self, model_strs: Union[str, Iterable[str]], excluded_codes: List[int]=[]):
+        """
+        Checks the models for rate law errors and warnings.
+
+        Args:
+            model_strs (str or Iterable[str]): Paths to the model files, or the string representations
+                of models, or a directory, glob pattern or archive of models.
+            excluded_codes (List[int]): List of codes of the checks to exclude.
+
+        Returns:
+            OrderedDict: The results of each model, keyed by the model id. Models that could
+                not be analyzed map to None, their error messages are in self.errors.
+        """
+        self.results = OrderedDict(self.iter_check_models(model_strs, excluded_codes))
+        return self.results
+
+    def iter_check_models(self, source: Union[str, Iterable[str]], excluded_codes: List[int]=[]):
+        """
+        Checks the models for rate law errors and warnings, yielding the results of each model
+        as soon as it and the models before it are done. The models are read lazily and only a
+        few per worker are in flight, the analysis data of a model is released once its results
+        are returned, so the memory use does not grow with the number of models.
+
+        Args:
+            source (str or Iterable[str]): A directory, a glob pattern, an archive, or an
+                iterable of paths to model files or archives or string representations of models.
+            excluded_codes (List[int]): List of codes of the checks to exclude.
+
+        Yields:
+            (str, Results): The id of the model and its results, None if the model could not be
+                analyzed, its error message is then in self.errors. The id of a model is the
+                model as given, or its path for models in a directory, glob pattern or archive.
+        """
+        self.errors = OrderedDict()
+        models = _iter_models(source)
+        if self.converter is not None:
+            models = _prefetch_conversions(models, self.converter, 2 * max(self.workers, self.converter.workers))
+        excluded_codes = list(excluded_codes)
+        if self.workers == 1:
+            for model_id, model_str in models:
+                outcome = _check_model((model_str, self.rate_law_classifications_path,
+                                        self.abort_on_complicated_rate_laws, excluded_codes, self.cache,
+                                        self.extraction_backend))
+                yield model_id, self._add_outcome(model_id, outcome)
+            return
+        # the chunks in flight, as (model ids, tasks, future) in the order of the models, the
+        # future is None for a model lost in a broken pool that is retried on its own
+        pending = deque()
+        max_pending = 2 * self.workers
+        # number of models in pending waiting to be retried
+        retries = 0
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while True:
+                # no chunk is submitted while a model is retried, so that a retried model that
+                # breaks the pool again is known to be the one that broke it
+                while len(pending) < max_pending and not retries:
+                    chunk = [model for _, model in zip(range(self.chunksize), models)]
+                    if not chunk:
+                        break
+                    tasks = [(model_str, self.rate_law_classifications_path, self.abort_on_complicated_rate_laws,
+                              excluded_codes, self.cache, self.extraction_backend) for _, model_str in chunk]
+                    pending.append(([model_id for model_id, _ in chunk], tasks, executor.submit(_check_chunk, tasks)))
+                if not pending:
+                    return
+                model_ids, tasks, future = pending.popleft()
+                is_retry = future is None
+                if is_retry:
+                    retries -= 1
+                    future = executor.submit(_check_chunk, tasks)
+                try:
+                    outcomes = future.result()
+                except BrokenProcessPool:
+                    # the pool cannot run any further task, the chunks in flight are lost
+                    _shutdown(executor, [future for _, _, future in pending if future is not None], wait=False)
+                    executor = ProcessPoolExecutor(max_workers=self.workers)
+                    if is_retry:
+                        # the model ran alone, it broke the pool
+                        outcomes = [(False, _BROKEN_WORKER_MESSAGE)]
+                    else:
+                        # any chunk in flight might have broken the pool, the models of the chunks
+                        # without results are retried one by one
+                        lost = [(model_ids, tasks, future)] + list(pending)
+                        pending.clear()
+                        for chunk_ids, chunk_tasks, chunk_future in lost:
+                            if chunk_future.done() and not chunk_future.cancelled() and chunk_future.exception() is None:
+                                pending.append((chunk_ids, chunk_tasks, chunk_future))
+                                continue
+                            for model_id, task in zip(chunk_ids, chunk_tasks):
+                                pending.append(([model_id], [task], None))
+                                retries += 1
+                        continue
+                for model_id, outcome in zip(model_ids, outcomes):
+                    yield model_id, self._add_outcome(model_id, outcome)
+        finally:
+            _shutdown(executor, [future for _, _, future in pending if future is not None], wait=True)
+
+    def _add_outcome(self, model_id, outcome):
+        is_success, result = outcome
+        if is_success:
+            return result
+        self.errors[model_id] = result
+        return None
+
+
+def check_models(model_strs: Union[str, Iterable[str]], rate_law_classifications_path: str=None,
+                 abort_on_complicated_rate_laws: bool=True, excluded_codes: List[int]=[],
+                 workers: int=None, chunksize: int=1, cache: ResultCache=None,
+                 extraction_backend: str=SIMPLESBML, converter: AntimonyConverter=None):
+    """
+    Checks SBML models for rate law errors and warnings on a pool of worker processes.
+
+    Args:
+        model_strs (str or Iterable[str]): Paths to the model files, or the string representations
+            of models, or a directory, glob pattern or archive of models.
+        rate_law_classifications_path (str): Path to the rate law classification file.
+        abort_on_complicated_rate_laws (bool): If True, the check will abort if the rate law is too complicated to process.
+        excluded_codes (List[int]): List of codes of the checks to exclude.
+        workers (int): Number of worker processes, the number of CPUs if None.
+        chunksize (int): Number of models sent to a worker at a time.
+        cache (ResultCache): If given, reactions checked before are not checked again.
+        extraction_backend (str): "simplesbml" or "libsbml", the library the reactions are extracted with.
+        converter (AntimonyConverter): If given, the Antimony models are converted in the workers of the converter.
+
+    Returns:
+        OrderedDict: The results of each model, keyed by the model id. Models that could
+            not be analyzed map to None, use BatchAnalyzer to get their error messages.
+    """
+    batch = BatchAnalyzer(rate_law_classifications_path, abort_on_complicated_rate_laws, workers, chunksize, cache,
+                          extraction_backend, converter)
+    return batch.check_models(model_strs, excluded_codes)
+
+
+def iter_check_models(source: Union[str, Iterable[str]], rate_law_classifications_path: str=None,
+                      abort_on_complicated_rate_laws: bool=True, excluded_codes: List[int]=[],
+                      workers: int=1, chunksize: int=1, cache: ResultCache=None,
+                      extraction_backend: str=SIMPLESBML, converter: AntimonyConverter=None):
+    """
+    Checks SBML models for rate law errors and warnings, yielding the results of each model
+    as soon as it is done, so that a large corpus can be checked in constant memory.
+
+    Args:
+        source (str or Iterable[str]): A directory, a glob pattern, an archive, or an
+            iterable of paths to model files or archives or string representations of models.
+        rate_law_classifications_path (str): Path to the rate law classification file.
+        abort_on_complicated_rate_laws (bool): If True, the check will abort if the rate law is too complicated to process.
+        excluded_codes (List[int]): List of codes of the checks to exclude.
+        workers (int): Number of worker processes, the number of CPUs if None. With one
+            worker the models are checked in the calling process.
+        chunksize (int): Number of models sent to a worker at a time.
+        cache (ResultCache): If given, reactions checked before are not checked again.
+        extraction_backend (str): "simplesbml" or "libsbml", the library the reactions are extracted with.
+        converter (AntimonyConverter): If given, the Antimony models are converted in the workers of the
+            converter while the models before them are checked.
+
+    Yields:
+        (str, Results): The id of the model and its results, None if the model could not be
+            analyzed, use BatchAnalyzer to get its error message.
+    """
+    batch = BatchAnalyzer(rate_law_classifications_path, abort_on_complicated_rate_laws, workers, chunksize, cache,
+                          extraction_backend, converter)
+    yield from batch.iter_check_models(source, excluded_codes)
@@ -0,0 +1,246 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import hashlib
+import threading
+import sys
+import os
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from common import util
+
+antimony = util.LazyModule("antimony")
+
+# number of converted models kept in memory
+CONVERSION_MEMO_SIZE = 256
+
+# Antimony keeps the last loaded model in global state, conversions in a process are serialized
+_ANTIMONY_LOCK = threading.Lock()
+
+
+def convert_antimony(antimony_str):
+    """Converts an Antimony model to SBML in the calling process, also run in the workers
+    of a converter.
+
+    Args:
+        antimony_str (str): The Antimony model.
+
+    Returns:
+        str: The SBML model, None if antimony_str is not a valid Antimony model.
+    """
+    with _ANTIMONY_LOCK:
+        if antimony.loadAntimonyString(antimony_str) > 0:
+            return antimony.getSBMLString()
+        return None
+
+
+def _digest(antimony_str):
+    return hashlib.sha256(antimony_str.encode()).hexdigest()
+
+
+class _ConversionMemo:
+    """
+    A least recently used memo of converted models, keyed by the hash of the Antimony model.
+    A model that cannot be converted is memoized as an empty string.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the memoized SBML model, None if there is none."""
+        with self._lock:
+            xml = self._entries.get(key)
+            if xml is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return xml
+
+    def put(self, key, xml):
+        """Memoizes an SBML model, evicting the least recently used one if full."""
+        with self._lock:
+            self._entries[key] = xml
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Removes the memoized models and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+CONVERSION_MEMO = _ConversionMemo(CONVERSION_MEMO_SIZE)
+
+
+def _lookup(key, antimony_str, cache):
+    """Looks up a converted model in memory, then in the persistent cache.
+
+    Returns:
+        str: The SBML model, an empty string if the model cannot be converted, None if
+            the conversion is not cached.
+    """
+    xml = CONVERSION_MEMO.get(key)
+    if xml is None and cache is not None:
+        value = cache.get(cache.conversion_key(antimony_str))
+        if value is not None:
+            xml = value["sbml"] or ""
+            CONVERSION_MEMO.put(key, xml)
+    return xml
+
+
+def _store(key, antimony_str, cache, xml):
+    CONVERSION_MEMO.put(key, xml or "")
+    if cache is not None:
+        cache.put(cache.conversion_key(antimony_str), {"sbml": xml})
+
+
+def antimony_to_sbml(antimony_str, cache=None, converter=None):
+    """Converts an Antimony model to SBML, or looks up its earlier conversion.
+
+    Args:
+        antimony_str (str): The Antimony model.
+        cache (ResultCache): If given, the conversion is also looked up in and stored to the
+            persistent cache.
+        converter (AntimonyConverter): If given, the model is converted in the worker
+            processes of the converter instead of the calling process.
+
+    Returns:
+        str: The SBML model, None if antimony_str is not a valid Antimony model.
+    """
+    if converter is not None:
+        return converter.convert(antimony_str)
+    key = _digest(antimony_str)
+    xml = _lookup(key, antimony_str, cache)
+    if xml is None:
+        xml = convert_antimony(antimony_str)
+        _store(key, antimony_str, cache, xml)
+    return xml or None
+
+
+class AntimonyConverter:
+    """
+    Converts Antimony models to SBML in a pool of worker processes, each with its own
+    Antimony state. Models are converted in parallel, and the calling process never touches
+    the global state of the Antimony library, so a converter can be shared across threads.
+    Concurrent conversions of the same model are merged, and the converted models are
+    memoized, and stored to the persistent cache if one is given.
+
+    Examples:
+        with AntimonyConverter(workers=4) as converter:
+            results = check_models("path/to/antimony_models", workers=1, converter=converter)
+    """
+
+    def __init__(self, workers: int=2, cache=None):
+        """
+        Initializes the AntimonyConverter class, the workers are started on first use.
+
+        Args:
+            workers (int): Number of worker processes.
+            cache (ResultCache): If given, conversions are looked up in and stored to the
+                persistent cache.
+        """
+        if workers < 1:
+            raise ValueError("workers should be at least 1.")
+        self.workers = workers
+        self.cache = cache
+        self._executor = None
+        # the conversions in flight, keyed by the hash of the Antimony model
+        self._pending = {}
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, antimony_str: str):
+        """
+        Starts the conversion of an Antimony model, unless it is cached or in flight.
+
+        Args:
+            antimony_str (str): The Antimony model.
+
+        Returns:
+            concurrent.futures.Future: The SBML model, None if antimony_str is not a valid
+                Antimony model or its worker terminated abruptly.
+        """
+        key = _digest(antimony_str)
+        xml = _lookup(key, antimony_str, self.cache)
+        if xml is not None:
+            future = Future()
+            future.set_result(xml or None)
+            return future
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            try:
+                future = self._get_executor().submit(convert_antimony, antimony_str)
+            except BrokenProcessPool:
+                # a worker died in an earlier conversion, the pool is replaced, and its
+                # conversions in flight have failed with it
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                future = self._get_executor().submit(convert_antimony, antimony_str)
+            self._pending[key] = future
+            future.add_done_callback(partial(self._finish, key, antimony_str))
+        return future
+
+    def convert(self, antimony_str: str):
+        """
+        Converts an Antimony model to SBML.
+
+        Args:
+            antimony_str (str): The Antimony model.
+
+        Returns:
+            str: The SBML model, None if antimony_str is not a valid Antimony model or its
+                worker terminated abruptly.
+        """
+        try:
+            return self.submit(antimony_str).result()
+        except BrokenProcessPool:
+            return None
+
+    def close(self):
+        """
+        Stops the workers, if any, and cancels the conversions in flight.
+        """
+        with self._lock:
+            # Executor.shutdown only cancels the pending conversions itself from Python 3.9
+            for future in list(self._pending.values()):
+                future.cancel()
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            self._pending.clear()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _finish(self, key, antimony_str, future):
+        with self._lock:
+            self._pending.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            _store(key, antimony_str, self.cache, future.result())
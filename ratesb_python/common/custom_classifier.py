@@ -1,19 +1,341 @@
-from itertools import combinations, chain
+from collections import OrderedDict
+from itertools import combinations, chain, permutations
 import json
 
 import sys
 import os
 current_dir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = os.path.dirname(current_dir)
-sys.path.append(current_dir)
-sys.path.append(parent_dir)
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
 
 from common import util
+import hashlib
+import random
 import re
-import sympy
+import threading
+
+np = util.LazyModule("numpy")
+sympy = util.LazyModule("sympy")
+
+# time budget in seconds of a rate law, it is too complex to process past it
+TIMEOUT = 10
+
+# compiled classification libraries shared by every classifier in the process,
+# keyed by the absolute path of the classification file
+_LIBRARY_CACHE = {}
+_LIBRARY_CACHE_LOCK = threading.Lock()
+
+# number of rate law shapes whose classification is memoized
+CLASSIFICATION_MEMO_SIZE = 4096
+
+# number of kinetic law families whose candidate rate laws are memoized per library
+CANDIDATES_MEMO_SIZE = 1024
+
+
+class _ClassificationMemo:
+    """
+    A least recently used memo of classifications, keyed by the kinetic law with its ids
+    replaced by their roles (e.g. "parameter*reactant1"), so that rate laws of the same
+    shape are classified once per process, within and across models.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns a copy of the memoized classification, None if there is none."""
+        with self._lock:
+            classification = self._entries.get(key)
+            if classification is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return dict(classification)
+
+    def put(self, key, classification):
+        """Memoizes a classification, evicting the least recently used one if full."""
+        with self._lock:
+            self._entries[key] = dict(classification)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Removes the memoized classifications and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+CLASSIFICATION_MEMO = _ClassificationMemo(CLASSIFICATION_MEMO_SIZE)
+
+# reactant and product slots of a rate law, e.g. "reactant1"
+_SLOT_PATTERN = re.compile(r'^(reactant|product)(\d+)$')
+# standard terms of a rate law other than the reactant and product slots
+_STANDARD_TERMS = ("compartment", "parameter", "enzyme")
+# seed of the sample values used to order interchangeable slots
+_SLOT_SEED = "slots"
+_SLOT_BASES = 2
+_SLOT_SAMPLES = 4
+
+
+def _slot_values(name, count):
+    """Returns seeded sample values, stable across processes."""
+    rng = random.Random("%s:%s" % (_SLOT_SEED, name))
+    return [rng.uniform(1, 10) for _ in range(count)]
+
+
+def _family(expr):
+    """Returns the structural family of a rate law with standard terms.
+
+    Args:
+        expr (sympy.Expr): The rate law, with standard terms.
+
+    Returns:
+        tuple: The number of reactant and product slots, the other standard terms in the
+            rate law, and whether it is a polynomial.
+    """
+    counts = {"reactant": 0, "product": 0}
+    terms = set()
+    for symbol in expr.free_symbols:
+        match = _SLOT_PATTERN.match(str(symbol))
+        if match:
+            counts[match.group(1)] += 1
+        elif str(symbol) in _STANDARD_TERMS:
+            terms.add(str(symbol))
+    return counts["reactant"], counts["product"], frozenset(terms), expr.is_polynomial()
+
+
+def _may_match(variant_family, kinetics_family):
+    """Decides whether a kinetic law might be equal to a rate law variant, from their families.
+
+    The variants are simplified, so a variant depends on each of its symbols and is only a
+    fraction if it cannot be reduced to a polynomial. A kinetic law is not simplified, so its
+    family over-approximates it: it might not depend on all of its symbols, e.g.
+    (reactant1*reactant2 + reactant1)/(reactant2 + 1), and it might be a reducible fraction.
+    A kinetic law that is written as a polynomial is a polynomial however it is rearranged.
+
+    Args:
+        variant_family (tuple): The family of the rate law variant.
+        kinetics_family (tuple): The family of the kinetic law.
+
+    Returns:
+        bool: False if the kinetic law cannot be equal to the variant.
+    """
+    variant_reactants, variant_products, variant_terms, is_variant_polynomial = variant_family
+    reactants, products, terms, is_polynomial = kinetics_family
+    return (variant_reactants <= reactants and variant_products <= products and variant_terms <= terms
+            and (is_variant_polynomial or not is_polynomial))
+
+
+def _relabel_slots(compiled, groups):
+    """Relabels interchangeable reactant or product slots in a canonical order.
+
+    Slots of the same kind are told apart by an invariant: the values of the expression
+    when only that slot varies, while every slot of the same kind shares one base value.
+    The invariant does not depend on how the slots are numbered, so two expressions that
+    are equal up to a permutation of their slots are relabeled into the same expression.
+    Slots with the same invariant are assumed to be interchangeable.
+
+    Args:
+        compiled (util.CompiledExpression): The expression to relabel.
+        groups (list): (kind, slots, labels) tuples, where kind is "reactant" or "product",
+            slots are the symbols to relabel and labels the symbols they are relabeled to,
+            in increasing order.
+
+    Returns:
+        util.CompiledExpression: The relabeled expression.
+    """
+    kind_of = {}
+    for kind, slots, labels in groups:
+        for slot in slots:
+            kind_of[slot] = kind
+
+    def base_name(symbol):
+        if symbol in kind_of:
+            return kind_of[symbol]
+        match = _SLOT_PATTERN.match(str(symbol))
+        return match.group(1) if match else str(symbol)
+
+    samples = _slot_values("sample", _SLOT_SAMPLES)
+    mapping = {}
+    for kind, slots, labels in groups:
+        if len(slots) < 2:
+            mapping.update(zip(slots, labels))
+            continue
+        # one row per slot, one column per base point and sample value
+        values = {}
+        for symbol in compiled.symbols:
+            bases = _slot_values(base_name(symbol), _SLOT_BASES)
+            row = [base for base in bases for _ in samples]
+            values[symbol] = np.array([samples * _SLOT_BASES if symbol == slot else row for slot in slots])
+        with np.errstate(all='ignore'):
+            result = np.broadcast_to(np.asarray(compiled.evaluate(values), dtype=complex), (len(slots), _SLOT_BASES * _SLOT_SAMPLES))
+        invariants = [tuple("%.6g,%.6g" % (value.real + 0.0, value.imag + 0.0) for value in row) for row in result]
+        order = sorted(range(len(slots)), key=lambda i: (invariants[i], i))
+        mapping.update((slots[i], label) for i, label in zip(order, labels))
+    return compiled.xreplace(mapping)
+
+
+class _CompiledRateLaw:
+    """A rate law classification whose expression variants are compiled once.
+
+    Attributes:
+        name (str): The name of the rate law.
+        expression (str): The expression of the rate law, using "**" for powers.
+        optional_symbols (list): Symbols that do not have to appear in a matching rate law.
+        power_limited_species (list): Species whose power is kept when comparing.
+    """
+    def __init__(self, item):
+        self.name = item['name']
+        self.expression = item['expression'].replace("^", "**")
+        self.optional_symbols = item['optional_symbols']
+        self.power_limited_species = item['power_limited_species']
+        self._variants = None
+        self._canonical_variants = None
+
+    @property
+    def variants(self):
+        """The expression with every combination of optional symbols replaced by 1,
+        sympified, simplified and lambdified on first use.
+
+        Returns:
+            list: A list of util.CompiledExpression.
+        """
+        if self._variants is None:
+            variants = []
+            for expr in _CustomClassifier.get_all_expr(self.expression, self.optional_symbols):
+                variants.append(util.CompiledExpression(sympy.simplify(sympy.sympify(expr))))
+            self._variants = variants
+        return self._variants
+
+    @property
+    def canonical_variants(self):
+        """The variants with the reactant and product slots that are not power limited
+        relabeled in a canonical order, so they can be compared without permutations.
+
+        Returns:
+            list: A list of util.CompiledExpression.
+        """
+        if self._canonical_variants is None:
+            canonical_variants = []
+            for variant in self.variants:
+                groups = []
+                for kind in ("reactant", "product"):
+                    slots = [symbol for symbol in variant.symbols
+                             if str(symbol) not in self.power_limited_species
+                             and _SLOT_PATTERN.match(str(symbol))
+                             and _SLOT_PATTERN.match(str(symbol)).group(1) == kind]
+                    slots.sort(key=lambda symbol: int(_SLOT_PATTERN.match(str(symbol)).group(2)))
+                    groups.append((kind, slots, list(slots)))
+                canonical_variants.append(_relabel_slots(variant, groups))
+            self._canonical_variants = canonical_variants
+        return self._canonical_variants
+
+
+class _ClassificationLibrary:
+    """The validated and compiled rate laws of one classification file.
+
+    Attributes:
+        digest (str): The SHA-256 digest of the file content the library was built from.
+        custom_classifications (list): The valid rate law classifications in the file.
+        warning_message (str): A message warning about the invalid items in the file.
+        rate_laws (list): A list of _CompiledRateLaw, in the order of the file.
+    """
+    def __init__(self, digest, custom_classifications, warning_message):
+        self.digest = digest
+        self.custom_classifications = custom_classifications
+        self.warning_message = warning_message
+        self.rate_laws = [_CompiledRateLaw(item) for item in custom_classifications]
+        self._fingerprint_index = None
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprint_index(self):
+        """The fingerprint index of the rate laws, built on first use.
+
+        Returns:
+            _FingerprintIndex: The index of the rate laws.
+        """
+        if self._fingerprint_index is None:
+            # classifiers in other threads wait for the index instead of building their own
+            with self._lock:
+                if self._fingerprint_index is None:
+                    self._fingerprint_index = _FingerprintIndex(self.rate_laws)
+        return self._fingerprint_index
+
+
+class _FingerprintIndex:
+    """Hash index from the fingerprints of the rate law variants to the rate laws.
+
+    A kinetic law is compared with the rate laws under their power limited species,
+    so the variants are indexed under both their power limited species and their fingerprint.
+
+    The rate laws are also indexed by the families of their variants, so that a kinetic
+    law is only brought into the canonical forms of the power limited species of the rate
+    laws it might match.
+
+    Attributes:
+        keep_groups (dict): Indices of the rate laws, keyed by their power limited species.
+        entries (dict): Lists of (rate law index, variant), keyed by (power limited species, fingerprint).
+        unindexed (list): Indices of the rate laws with a variant that cannot be fingerprinted.
+        families (dict): Sets of indices of the rate laws with a variant of the family, keyed by family.
+    """
+    def __init__(self, rate_laws):
+        self.keep_groups = {}
+        self.entries = {}
+        self.unindexed = []
+        self.families = {}
+        self._candidates = {}
+        for index, rate_law in enumerate(rate_laws):
+            keep = tuple(rate_law.power_limited_species)
+            self.keep_groups.setdefault(keep, []).append(index)
+            try:
+                variants = rate_law.canonical_variants
+            except Exception:
+                # a rate law that cannot be compiled never matches
+                continue
+            for variant in variants:
+                self.families.setdefault(_family(variant.expr), set()).add(index)
+            fingerprints = [util.fingerprint(variant) for variant in variants]
+            if None in fingerprints:
+                self.unindexed.append(index)
+                continue
+            for fingerprint, variant in zip(fingerprints, variants):
+                self.entries.setdefault((keep, fingerprint), []).append((index, variant))
+
+    def candidates(self, kinetics_family):
+        """Returns the indices of the rate laws a kinetic law of the family might match.
+
+        Args:
+            kinetics_family (tuple): The family of the kinetic law.
+
+        Returns:
+            set: The indices of the rate laws with a variant the kinetic law might be equal to.
+        """
+        candidates = self._candidates.get(kinetics_family)
+        if candidates is None:
+            candidates = set()
+            for variant_family, rate_law_indices in self.families.items():
+                if _may_match(variant_family, kinetics_family):
+                    candidates.update(rate_law_indices)
+            if len(self._candidates) >= CANDIDATES_MEMO_SIZE:
+                self._candidates.clear()
+            self._candidates[kinetics_family] = candidates
+        return candidates
 
-# timeout if rate law is too complex
-TIMEOUT = 10000
 
 class _CustomClassifier:
     """Custom Classifier for rate laws.
@@ -24,6 +346,7 @@ class _CustomClassifier:
         rate_law_classifications_path (str): The path to the rate law classifications.
         custom_classifications (list): A list of custom classifications.
         warning_message (str): A message warning about potential issues.
+        library (_ClassificationLibrary): The compiled rate laws, shared process-wide.
     """
     def __init__(self, rate_law_classifications_path):
         """Constructs all the necessary attributes for the custom classifier object.
@@ -34,12 +357,15 @@ class _CustomClassifier:
         self.rate_law_classifications_path = rate_law_classifications_path
         self.custom_classifications = []
         self.warning_message = ""
+        self.library = None
         self.validate()
         
     def validate(self):
         """Validates the rate law classifications file.
         
         It checks if the file is a JSON file, loads the file, and validates its contents.
+        The validated rate laws are compiled into a library shared by every classifier
+        in the process, which is rebuilt only when the content of the file changes.
         """
         splitted_path = os.path.splitext(self.rate_law_classifications_path)
         ext = splitted_path[1]
@@ -49,7 +375,17 @@ class _CustomClassifier:
             # read the file and load the data
             with open(self.rate_law_classifications_path, 'r') as file:
                 json_str = file.read()
-                unchecked_custom_classifications = json.loads(json_str)
+            digest = hashlib.sha256(json_str.encode()).hexdigest()
+            key = os.path.abspath(self.rate_law_classifications_path)
+            library = _LIBRARY_CACHE.get(key)
+            if library is not None and library.digest == digest:
+                self.library = library
+                self.custom_classifications = library.custom_classifications
+                self.warning_message = library.warning_message
+                return
+            unchecked_custom_classifications = json.loads(json_str)
+            self.custom_classifications = []
+            self.warning_message = ""
 
             # This list will be used to collect all warnings
             warnings = []
@@ -114,27 +450,59 @@ class _CustomClassifier:
                 self.warning_message = 'Some items in your JSON file were invalid and have been removed.\nDetails:\n'
                 self.warning_message += '\n'.join(warnings)
 
-    def permute(self, arr):
-        """Generates all permutations of a list.
+            library = _ClassificationLibrary(digest, self.custom_classifications, self.warning_message)
+            with _LIBRARY_CACHE_LOCK:
+                # another thread might have validated the same file in the meantime
+                cached_library = _LIBRARY_CACHE.get(key)
+                if cached_library is not None and cached_library.digest == digest:
+                    library = cached_library
+                else:
+                    _LIBRARY_CACHE[key] = library
+            self.library = library
+            self.custom_classifications = library.custom_classifications
+            self.warning_message = library.warning_message
+
+    def replace_occurrences(self, reactants_in_kinetic_law, products_in_kinetic_law, enzyme_list, compartment_in_kinetic_law, parameters_in_kinetic_law_only, kinetics_sim):
+        """Replaces the occurrences of different elements in the kinetics_sim with standard terms.
+
+        Reactants and products are numbered in the order they are given, the classifier
+        relabels them in a canonical order afterwards instead of trying every permutation.
 
         Args:
-            arr (list): The list for which permutations are to be generated.
+            reactants_in_kinetic_law (list): List of reactants in the kinetic law.
+            products_in_kinetic_law (list): List of products in the kinetic law.
+            enzyme_list (list): List of enzymes in the kinetic law.
+            compartment_in_kinetic_law (list): List of compartments in the kinetic law.
+            parameters_in_kinetic_law_only (list): List of parameters only present in the kinetic law.
+            kinetics_sim (str): The kinetics simulation string.
 
         Returns:
-            list: A list of all permutations.
+            str: The replaced kinetics.
         """
-        if len(arr) == 1:
-            return [arr]
-        permutations = []
-        for i in range(len(arr)):
-            remaining = arr[:i] + arr[i+1:]
-            subPermutations = self.permute(remaining)
-            mappedPermutations = [[arr[i]] + subPermutation for subPermutation in subPermutations]
-            permutations.extend(mappedPermutations)
-        return permutations
+        symbol_pattern = re.compile(r'\W')
+        symbols = re.split(symbol_pattern, kinetics_sim)
+        replaced_symbols = []
+        for symbol in symbols:
+            if symbol in reactants_in_kinetic_law:
+                index = reactants_in_kinetic_law.index(symbol) + 1
+                replaced_symbols.append('reactant' + str(index))
+            elif symbol in products_in_kinetic_law:
+                index = products_in_kinetic_law.index(symbol) + 1
+                replaced_symbols.append('product' + str(index))
+            elif symbol in enzyme_list:
+                replaced_symbols.append('enzyme')
+            elif symbol in compartment_in_kinetic_law:
+                replaced_symbols.append('compartment')
+            elif symbol in parameters_in_kinetic_law_only:
+                replaced_symbols.append('parameter')
+            else:
+                replaced_symbols.append(symbol)
+        non_alphanumeric_chars = re.findall(symbol_pattern, kinetics_sim)
+        return ''.join([symbol + (non_alphanumeric_chars[i] if i < len(non_alphanumeric_chars) else '') for i, symbol in enumerate(replaced_symbols)])
 
-    def replace_occurrences(self, reactants_in_kinetic_law, products_in_kinetic_law, enzyme_list, compartment_in_kinetic_law, parameters_in_kinetic_law_only, kinetics_sim):
-        """Replaces the occurrences of different elements in the kinetics_sim with standard terms.
+    def role_mapping(self, reactants_in_kinetic_law, products_in_kinetic_law, enzyme_list, compartment_in_kinetic_law, parameters_in_kinetic_law_only):
+        """Maps the symbols of a parsed kinetic law to standard terms, the same way
+        replace_occurrences replaces them in a kinetics string.
 
         Args:
             reactants_in_kinetic_law (list): List of reactants in the kinetic law.
@@ -142,39 +510,25 @@ class _CustomClassifier:
             enzyme_list (list): List of enzymes in the kinetic law.
             compartment_in_kinetic_law (list): List of compartments in the kinetic law.
             parameters_in_kinetic_law_only (list): List of parameters only present in the kinetic law.
-            kinetics_sim (str): The kinetics simulation string.
 
         Returns:
-            list: List of replaced kinetics.
+            dict: The standard term of each symbol, keyed by the symbol.
         """
-        permuted_reactants = self.permute(reactants_in_kinetic_law) or [[]]
-        permuted_products = self.permute(products_in_kinetic_law) or [[]]
-        
-        ret = []
-        symbol_pattern = re.compile(r'\W')
-        for reactant_perm in permuted_reactants:
-            for product_perm in permuted_products:
-                symbols = re.split(symbol_pattern, kinetics_sim)
-                replaced_symbols = []
-                for symbol in symbols:
-                    if symbol in reactant_perm:
-                        index = reactant_perm.index(symbol) + 1
-                        replaced_symbols.append('reactant' + str(index))
-                    elif symbol in product_perm:
-                        index = product_perm.index(symbol) + 1
-                        replaced_symbols.append('product' + str(index))
-                    elif symbol in enzyme_list:
-                        replaced_symbols.append('enzyme')
-                    elif symbol in compartment_in_kinetic_law:
-                        replaced_symbols.append('compartment')
-                    elif symbol in parameters_in_kinetic_law_only:
-                        replaced_symbols.append('parameter')
-                    else:
-                        replaced_symbols.append(symbol)
-                non_alphanumeric_chars = re.findall(symbol_pattern, kinetics_sim)
-                replaced_string = ''.join([symbol + (non_alphanumeric_chars[i] if i < len(non_alphanumeric_chars) else '') for i, symbol in enumerate(replaced_symbols)])
-                ret.append(replaced_string)
-        return ret
+        mapping = {}
+        # from the lowest to the highest precedence, so that the earlier lists win
+        for ids, term in ((parameters_in_kinetic_law_only, 'parameter'), (compartment_in_kinetic_law, 'compartment'), (enzyme_list, 'enzyme')):
+            mapping.update((sympy.Symbol(id), sympy.Symbol(term)) for id in ids)
+        for ids, term in ((products_in_kinetic_law, 'product'), (reactants_in_kinetic_law, 'reactant')):
+            mapping.update((sympy.Symbol(id), sympy.Symbol(term + str(index + 1))) for index, id in enumerate(ids))
+        return mapping
+
+    def compile_library(self):
+        """Compiles the rate laws and their fingerprint index, if not compiled yet.
+
+        The compiled library is shared by every reaction, so it is compiled before the
+        reactions are classified rather than on the first classification.
+        """
+        self.library.fingerprint_index
 
     def custom_classify(self, is_default = False, **kwargs):
         """Classify the provided data according to the rate laws defined in the file.
@@ -186,6 +540,8 @@ class _CustomClassifier:
             species_in_kinetic_law (list): List of species involved in the kinetics.
             parameters_in_kinetic_law_only (list): List of parameters present only in the kinetics law.
             compartment_in_kinetic_law (list): List of compartments present in the kinetics law.
+            kinetics_expression (sympy.Expr, optional): The parsed kinetics, used instead of
+                parsing the kinetics string if given.
 
         Returns:
             list: A list of dictionaries containing the name of the rate law and the result of the comparison.
@@ -202,35 +558,127 @@ class _CustomClassifier:
 
         ret = {}
         enzyme_list = [species for species in species_in_kinetic_law if species not in reactant_list and species not in product_list]
-        replaced_kinetics_list = self.replace_occurrences(reactants_in_kinetic_law, products_in_kinetic_law, enzyme_list, compartment_in_kinetic_law, parameters_in_kinetic_law_only, kinetics)
-        any_true = False
-        for item in self.custom_classifications:
-            if any_true and is_default:
-                ret[item['name']] = False
+        rate_laws = self.library.rate_laws
+        index = self.library.fingerprint_index
+        kinetics_expression = kwargs.get("kinetics_expression")
+        if kinetics_expression is not None:
+            replaced_kinetics_sympify = kinetics_expression.xreplace(self.role_mapping(
+                reactants_in_kinetic_law, products_in_kinetic_law, enzyme_list, compartment_in_kinetic_law, parameters_in_kinetic_law_only))
+        else:
+            replaced_kinetics = self.replace_occurrences(reactants_in_kinetic_law, products_in_kinetic_law, enzyme_list, compartment_in_kinetic_law, parameters_in_kinetic_law_only, kinetics)
+            try:
+                replaced_kinetics_sympify = sympy.sympify(replaced_kinetics)
+            except Exception:
+                return {rate_law.name: False for rate_law in rate_laws}
+        # the classification only depends on the kinetics with standard terms and the number
+        # of reactants and products the slots are numbered from
+        memo_key = (self.library.digest, is_default, replaced_kinetics_sympify,
+                    len(reactants_in_kinetic_law), len(products_in_kinetic_law))
+        ret = CLASSIFICATION_MEMO.get(memo_key)
+        if ret is not None:
+            return ret
+        # only the rate laws whose family is compatible with the kinetics can match
+        try:
+            candidates = index.candidates(_family(replaced_kinetics_sympify))
+        except Exception:
+            # a kinetic law whose family cannot be told is compared with every rate law
+            candidates = set(range(len(rate_laws)))
+        # the canonical kinetics only depend on the power limited species of a rate law,
+        # so they are computed once per reaction and shared between rate laws
+        canonical_kinetics = {}
+        matched = set()
+        # rate laws that cannot be looked up in the index are compared one by one
+        scanned = candidates.intersection(index.unindexed)
+        for keep, rate_law_indices in index.keep_groups.items():
+            rate_law_indices = [rate_law_index for rate_law_index in rate_law_indices if rate_law_index in candidates]
+            if not rate_law_indices:
                 continue
-            kinetics_expression = item['expression'].replace("^", "**")
-            optional_symbols = item['optional_symbols']
-            all_expr = self.get_all_expr(kinetics_expression, optional_symbols)
-            all_expr = [sympy.sympify(expr) for expr in all_expr]
-            power_limited_species = item['power_limited_species']
-            classified_true = False
             try:
-                for replaced_kinetics in replaced_kinetics_list:
-                    replaced_kinetics_sympify = self.lower_powers(sympy.sympify(replaced_kinetics), power_limited_species)
-                    replaced_kinetics_sympify = self.remove_constant_multiplier(replaced_kinetics_sympify)
-                    comparison_result = any(util.check_equal(expr, replaced_kinetics_sympify) for expr in all_expr)
-                    if comparison_result:
-                        ret[item['name']] = True
-                        classified_true = True
-                        any_true = True
-                        break
-            except:
-                ret[item['name']] = False
+                canonical_kinetics[keep] = self._canonical_kinetics(
+                    replaced_kinetics_sympify, len(reactants_in_kinetic_law), len(products_in_kinetic_law), list(keep))
+            except Exception:
+                continue
+            for compiled in canonical_kinetics[keep]:
+                fingerprint = util.fingerprint(compiled)
+                if fingerprint is None:
+                    scanned.update(rate_law_indices)
+                    continue
+                # confirm the hits, the fingerprint alone might collide
+                for rate_law_index, variant in index.entries.get((keep, fingerprint), []):
+                    if rate_law_index not in matched and self._check_equal(variant, compiled):
+                        matched.add(rate_law_index)
+        for rate_law_index in sorted(scanned):
+            if rate_law_index in matched:
+                continue
+            if is_default and matched and rate_law_index > min(matched):
+                break
+            rate_law = rate_laws[rate_law_index]
+            try:
+                variants = rate_law.canonical_variants
+            except Exception:
                 continue
-            if not classified_true:
-                ret[item['name']] = False
+            for compiled in canonical_kinetics.get(tuple(rate_law.power_limited_species), []):
+                if any(self._check_equal(variant, compiled) for variant in variants):
+                    matched.add(rate_law_index)
+                    break
+
+        ret = {}
+        any_true = False
+        for rate_law_index, rate_law in enumerate(rate_laws):
+            # the default rate laws are exclusive, the first match in the file wins
+            if any_true and is_default:
+                ret[rate_law.name] = False
+                continue
+            ret[rate_law.name] = rate_law_index in matched
+            any_true = any_true or ret[rate_law.name]
+        CLASSIFICATION_MEMO.put(memo_key, ret)
         return ret
 
+    def _canonical_kinetics(self, replaced_kinetics, num_reactants, num_products, power_limited_species):
+        """Brings a replaced kinetic law into the canonical form compared with the rate laws.
+
+        Power limited reactant and product slots (e.g. "reactant1") are assigned to every
+        possible species, the other slots are interchangeable and relabeled in a canonical
+        order, so the number of forms grows polynomially with the number of species.
+
+        Args:
+            replaced_kinetics (sympy.Expr): The kinetic law with standard terms.
+            num_reactants (int): The number of reactants in the kinetic law.
+            num_products (int): The number of products in the kinetic law.
+            power_limited_species (list): Species whose power is kept.
+
+        Returns:
+            list: A list of util.CompiledExpression, one per assignment of the power limited slots.
+        """
+        kinds = []
+        for kind, num in (("reactant", num_reactants), ("product", num_products)):
+            slots = [sympy.Symbol(kind + str(i)) for i in range(1, num + 1)]
+            kept = [slot for slot in slots if str(slot) in power_limited_species]
+            kinds.append((kind, slots, kept))
+        ret = []
+        (reactant_kind, reactants, kept_reactants), (product_kind, products, kept_products) = kinds
+        for reactant_assignment in permutations(reactants, len(kept_reactants)):
+            for product_assignment in permutations(products, len(kept_products)):
+                mapping = {}
+                groups = []
+                for (kind, slots, kept), assignment in zip(kinds, (reactant_assignment, product_assignment)):
+                    mapping.update(zip(assignment, kept))
+                    unassigned = [slot for slot in slots if slot not in assignment]
+                    dummies = [sympy.Dummy(kind) for _ in unassigned]
+                    mapping.update(zip(unassigned, dummies))
+                    groups.append((kind, dummies, [slot for slot in slots if slot not in kept]))
+                expr = self.lower_powers(replaced_kinetics.xreplace(mapping), power_limited_species)
+                expr = self.remove_constant_multiplier(expr)
+                ret.append(_relabel_slots(util.CompiledExpression(expr), groups))
+        return ret
+
+    def _check_equal(self, variant, compiled_kinetics):
+        """Checks if a rate law variant is equal to a compiled kinetic law, a failed evaluation counts as not equal."""
+        try:
+            return util.check_compiled_equal(variant, compiled_kinetics)
+        except Exception:
+            return False
+
     def lower_powers(self, expr, keep=[]):
         """Lowers the power of certain elements in the expression.
 
@@ -278,7 +726,8 @@ class _CustomClassifier:
         # Combine the processed terms back into an expression
         return sympy.Add(*new_terms)
 
-    def get_all_expr(self, expr, optional_symbols):
+    @staticmethod
+    def get_all_expr(expr, optional_symbols):
         """Generates all possible expressions by replacing the optional symbols with 1.
 
         Args:
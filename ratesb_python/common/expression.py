@@ -0,0 +1,75 @@
+from functools import cached_property
+import sys
+import os
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from common import util
+
+sp = util.LazyModule("sympy")
+
+
+class RateLawExpression:
+    """
+    A kinetic law parsed once and shared by the checks of a reaction. The artifacts derived
+    from it (simplified form, numerator and denominator, free symbols, compiled evaluator)
+    are computed on first use.
+
+    The ids of the model are parsed as plain symbols, so ids that are also sympy names
+    (e.g. "S", "E" or "beta") are not mistaken for sympy objects.
+    """
+
+    def __init__(self, kinetics: str, ids_list: list):
+        """
+        Initializes the RateLawExpression object.
+
+        Args:
+            kinetics (str): The kinetic law.
+            ids_list (list): The ids in the kinetic law.
+        """
+        self.kinetics = kinetics
+        self.ids_list = ids_list
+
+    @cached_property
+    def expr(self):
+        """The parsed kinetic law, None if it cannot be parsed."""
+        symbols = {id: sp.Symbol(id) for id in self.ids_list}
+        try:
+            return sp.sympify(self.kinetics, locals=symbols)
+        except Exception:
+            return None
+
+    @cached_property
+    def free_symbols(self):
+        """The names of the symbols in the kinetic law."""
+        if self.expr is None:
+            return set()
+        return {str(symbol) for symbol in self.expr.free_symbols}
+
+    @cached_property
+    def simplified(self):
+        """The simplified kinetic law, the parsed kinetic law if it cannot be simplified."""
+        if self.expr is None:
+            return None
+        try:
+            return sp.simplify(self.expr)
+        except Exception:
+            return self.expr
+
+    @cached_property
+    def numerator_denominator(self):
+        """The numerator and denominator of the simplified kinetic law, None if it cannot be parsed."""
+        if self.simplified is None:
+            return None
+        return self.simplified.as_numer_denom()
+
+    @cached_property
+    def compiled(self):
+        """The kinetic law compiled for numeric evaluation, None if it cannot be parsed."""
+        if self.expr is None:
+            return None
+        return util.CompiledExpression(self.expr)
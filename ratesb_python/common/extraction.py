@@ -0,0 +1,202 @@
+from dataclasses import dataclass
+import re
+import sys
+import os
+import warnings
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from typing import List
+from common import util
+
+libsbml = util.LazyModule("libsbml")
+
+# wraps the model in SBMLKinetics.common.simple_sbml.SimpleSBML
+SIMPLESBML = "simplesbml"
+# reads the model with libsbml directly, without building the SBMLKinetics object graph
+LIBSBML = "libsbml"
+EXTRACTION_BACKENDS = [SIMPLESBML, LIBSBML]
+
+# SBMLKinetics stops expanding nested function calls after this many rounds
+_MAX_EXPANSION_ROUNDS = 5
+# SBMLKinetics gives up listing the symbols of a kinetic law after visiting this many
+# operator, number and function nodes, and then reports no symbols
+_MAX_SYMBOL_NODES = 20
+
+
+@dataclass
+class ExtractedReaction:
+    reaction_id: str
+    # the kinetic law with the calls of function definitions expanded
+    kinetics: str
+    # the ids in the kinetic law, in the order they first appear
+    ids_list: List[str]
+    reactant_list: List[str]
+    product_list: List[str]
+    # the reactants, then the products, in the order of the species references
+    sorted_species: List[str]
+    is_reversible: bool
+    sbo_term: int
+
+
+def extract_reactions(model, backend: str=SIMPLESBML):
+    """
+    Extracts the reactions of a model.
+
+    Args:
+        model (libsbml.Model): The model.
+        backend (str): SIMPLESBML or LIBSBML, both extract the same reactions.
+
+    Returns:
+        List[ExtractedReaction]: The reactions, in the order of the model.
+    """
+    if backend == SIMPLESBML:
+        return _extract_reactions_simplesbml(model)
+    if backend == LIBSBML:
+        return _extract_reactions_libsbml(model)
+    raise ValueError("Invalid extraction backend, should be one of: " + ", ".join(EXTRACTION_BACKENDS))
+
+
+def _extract_reactions_simplesbml(model):
+    # SBMLKinetics pulls in pandas and matplotlib, it is imported on first use
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore",
+            category=SyntaxWarning,
+            module="SBMLKinetics.kinetics_output"
+        )
+        from SBMLKinetics.common.simple_sbml import SimpleSBML
+    reactions = []
+    for reaction in SimpleSBML(model).reactions:
+        libsbml_kinetics = reaction.kinetic_law.libsbml_kinetics
+        reactant_list = [r.getSpecies() for r in reaction.reactants]
+        product_list = [p.getSpecies() for p in reaction.products]
+        reactions.append(ExtractedReaction(
+            reaction_id=reaction.getId(),
+            kinetics=reaction.kinetic_law.expanded_formula,
+            ids_list=list(dict.fromkeys(reaction.kinetic_law.symbols)),
+            reactant_list=reactant_list,
+            product_list=product_list,
+            sorted_species=reactant_list + product_list,
+            is_reversible=reaction.reaction.getReversible(),
+            sbo_term=libsbml_kinetics.getSBOTerm() if libsbml_kinetics else -1,
+        ))
+    return reactions
+
+
+def _extract_reactions_libsbml(model):
+    function_definitions = get_function_definitions(model)
+    return [extract_reaction(model.getReaction(i), function_definitions) for i in range(model.getNumReactions())]
+
+
+def get_function_definitions(model):
+    """
+    Lists the function definitions of a model, as expand_function_calls takes them.
+
+    Args:
+        model (libsbml.Model): The model.
+
+    Returns:
+        list: (id, argument names, body) of each function definition.
+    """
+    function_definitions = []
+    for i in range(model.getNumFunctionDefinitions()):
+        function_definition = model.getFunctionDefinition(i)
+        arguments = [function_definition.getArgument(n).getName() for n in range(function_definition.getNumArguments())]
+        body = libsbml.formulaToL3String(function_definition.getBody())
+        function_definitions.append((function_definition.getId(), arguments, body))
+    return function_definitions
+
+
+def extract_reaction(reaction, function_definitions: list):
+    """
+    Extracts one reaction with libsbml, the same way both backends extract the reactions of
+    a model.
+
+    Args:
+        reaction (libsbml.Reaction): The reaction.
+        function_definitions (list): The function definitions of the model, from get_function_definitions.
+
+    Returns:
+        ExtractedReaction: The reaction.
+    """
+    kinetic_law = reaction.getKineticLaw()
+    reactant_list = [reaction.getReactant(n).getSpecies() for n in range(reaction.getNumReactants())]
+    product_list = [reaction.getProduct(n).getSpecies() for n in range(reaction.getNumProducts())]
+    formula = kinetic_law.getFormula() if kinetic_law else ""
+    return ExtractedReaction(
+        reaction_id=reaction.getId(),
+        kinetics=expand_function_calls(formula, function_definitions),
+        ids_list=list(dict.fromkeys(_kinetic_law_symbols(kinetic_law))),
+        reactant_list=reactant_list,
+        product_list=product_list,
+        sorted_species=reactant_list + product_list,
+        is_reversible=reaction.getReversible(),
+        sbo_term=kinetic_law.getSBOTerm() if kinetic_law else -1,
+    )
+
+
+def expand_function_calls(formula: str, function_definitions: list):
+    """
+    Replaces the calls of function definitions in a formula with their bodies, the same
+    way SBMLKinetics does.
+
+    Args:
+        formula (str): The formula.
+        function_definitions (list): (id, argument names, body) of each function definition.
+
+    Returns:
+        str: The expanded formula.
+    """
+    for _ in range(_MAX_EXPANSION_ROUNDS + 1):
+        is_done = True
+        for function_id, arguments, body in function_definitions:
+            calls = re.findall(r'{}\(.*?\)'.format(re.escape(function_id)), formula)
+            if not calls:
+                continue
+            is_done = False
+            for call in calls:
+                call_arguments = re.findall(r'\(.*?\)', call)[0].strip()[1:-1].split(',')
+                call_body = str(body)
+                for argument, call_argument in zip(arguments, call_arguments):
+                    call_body = call_body.replace(argument, call_argument.strip())
+                formula = formula.replace(call, call_body)
+        if is_done:
+            break
+    return formula
+
+
+def _kinetic_law_symbols(kinetic_law):
+    """
+    Lists the names in the math of a kinetic law, the same way SBMLKinetics does.
+
+    Args:
+        kinetic_law (libsbml.KineticLaw): The kinetic law, None if the reaction has none.
+
+    Returns:
+        List[str]: The names, possibly repeated.
+    """
+    math = kinetic_law.getMath() if kinetic_law else None
+    if math is None:
+        return []
+    symbols = [] if math.getName() is None else [math.getName()]
+    num_visited = 0
+
+    def visit(node):
+        nonlocal num_visited
+        num_visited += 1
+        if num_visited > _MAX_SYMBOL_NODES:
+            return False
+        for i in range(node.getNumChildren()):
+            child = node.getChild(i)
+            if child.getName() is None or child.isFunction():
+                if not visit(child):
+                    return False
+            else:
+                symbols.append(child.getName())
+        return True
+
+    return symbols if visit(math) else []
@@ -0,0 +1,154 @@
+import gzip
+import os
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+# extensions that decide the format of a model file, other files are sniffed from their first bytes
+SBML_EXTENSIONS = ('.xml', '.sbml')
+ANTIMONY_EXTENSIONS = ('.ant', '.txt')
+MODEL_EXTENSIONS = SBML_EXTENSIONS + ANTIMONY_EXTENSIONS
+# number of bytes read to sniff the format of a model file
+_SNIFF_SIZE = 4096
+_BOM = b'\xef\xbb\xbf'
+_GZIP_MAGIC = b'\x1f\x8b'
+# the manifest of a COMBINE archive, and the format of its SBML entries
+_MANIFEST = "manifest.xml"
+_SBML_FORMAT = "sbml"
+_MANIFEST_NAMESPACE = "{http://identifiers.org/combine.specifications/omex-manifest}"
+
+
+def is_path(model_str):
+    """Decides whether a model string is the path to a file.
+
+    Args:
+        model_str (str): Path to the model file, or the string representation of the model.
+
+    Returns:
+        bool: True if model_str is the path to a file.
+    """
+    # a path is short, a long model string is not looked up on the file system
+    return len(model_str) < 4096 and '\n' not in model_str and os.path.isfile(model_str)
+
+
+def _is_sbml_head(head):
+    if head.startswith(_BOM):
+        head = head[len(_BOM):]
+    return head.lstrip().startswith(b'<')
+
+
+def is_sbml_file(path):
+    """Decides whether a model file is SBML or Antimony, from its extension or else its first bytes.
+
+    Args:
+        path (str): Path to the model file.
+
+    Returns:
+        bool: True if the file is SBML.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in SBML_EXTENSIONS:
+        return True
+    if extension in ANTIMONY_EXTENSIONS:
+        return False
+    with open(path, 'rb') as file:
+        return _is_sbml_head(file.read(_SNIFF_SIZE))
+
+
+def is_archive(path):
+    """Decides whether a model file is a zip, COMBINE (.omex) or gzip archive, from its content.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        bool: True if the file is an archive.
+    """
+    if path.lower().endswith(MODEL_EXTENSIONS):
+        return False
+    with open(path, 'rb') as file:
+        if file.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC:
+            return True
+    return zipfile.is_zipfile(path)
+
+
+def iter_archive_models(path):
+    """Lists the models of an archive lazily, one entry is decompressed at a time. The models
+    of a COMBINE archive are its SBML entries, the models of another zip archive are its
+    entries with a model extension or SBML content. A gzip archive holds one model.
+
+    Args:
+        path (str): Path to the archive.
+
+    Yields:
+        (str, str): The name of the entry and the model string.
+    """
+    if not zipfile.is_zipfile(path):
+        name = os.path.basename(path)
+        if name.lower().endswith('.gz'):
+            name = name[:-len('.gz')]
+        with gzip.open(path, 'rb') as file:
+            yield name, file.read().decode('utf-8-sig')
+        return
+    with zipfile.ZipFile(path) as archive:
+        for name in _model_entries(archive)[0]:
+            yield name, archive.read(name).decode('utf-8-sig')
+
+
+def read_archive_model(path):
+    """Reads the model of an archive, the master SBML entry of a COMBINE archive or the sole
+    model of the archive.
+
+    Args:
+        path (str): Path to the archive.
+
+    Returns:
+        str: The model string.
+    """
+    if not zipfile.is_zipfile(path):
+        return next(iter_archive_models(path))[1]
+    with zipfile.ZipFile(path) as archive:
+        names, master = _model_entries(archive)
+        if master is not None:
+            names = [master]
+        if not names:
+            raise ValueError("No model found in the archive %s." % path)
+        if len(names) > 1:
+            raise ValueError("The archive %s holds several models, check them with check_models: %s."
+                             % (path, ", ".join(names)))
+        return archive.read(names[0]).decode('utf-8-sig')
+
+
+def _model_entries(archive):
+    """Lists the model entries of a zip archive.
+
+    Args:
+        archive (zipfile.ZipFile): The archive.
+
+    Returns:
+        (List[str], str): The names of the model entries, in the order of the archive, and
+            the name of the master entry, None if the archive does not name one.
+    """
+    names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    if _MANIFEST in names:
+        manifest = ElementTree.fromstring(archive.read(_MANIFEST))
+        entries, master = [], None
+        for content in manifest.iter(_MANIFEST_NAMESPACE + "content"):
+            name = posixpath.normpath(content.get("location", "")).lstrip("/")
+            if name not in names or _SBML_FORMAT not in content.get("format", "").lower():
+                continue
+            entries.append(name)
+            if content.get("master", "").lower() == "true":
+                master = name
+        return entries, master
+    entries = []
+    for name in names:
+        if name.startswith("__MACOSX/") or posixpath.basename(name).startswith("."):
+            continue
+        if name.lower().endswith(MODEL_EXTENSIONS):
+            entries.append(name)
+            continue
+        with archive.open(name) as file:
+            if _is_sbml_head(file.read(_SNIFF_SIZE)):
+                entries.append(name)
+    return entries, None
@@ -1,41 +1,32 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cached_property
+import hashlib
 import json
 import sys
 import os
 current_dir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
-sys.path.append(current_dir)
-sys.path.append(parent_dir)
-
-from custom_classifier import _CustomClassifier
-import warnings
-with warnings.catch_warnings():
-    warnings.filterwarnings("ignore", 
-        category=SyntaxWarning,
-        module="SBMLKinetics.kinetics_output"
-    )
-    from SBMLKinetics.common.simple_sbml import SimpleSBML
-    from SBMLKinetics.common.reaction import Reaction
-from typing import List
-import warnings
-with warnings.catch_warnings():
-    warnings.filterwarnings("ignore", 
-        category=SyntaxWarning,
-        module="SBMLKinetics.kinetics_output"
-    )
-    from SBMLKinetics import kinetics_output
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from custom_classifier import _CustomClassifier, TIMEOUT
 from common import util
 from results import Results
+from sandbox import simplify_kinetics
+from expression import RateLawExpression
+from symbol_table import SymbolTable, SPECIES, PARAMETER, COMPARTMENT, LOCAL_PARAMETER
+from extraction import extract_reactions, extract_reaction, get_function_definitions, SIMPLESBML
+import model_files
+from conversion import antimony_to_sbml
 
-import antimony
-import libsbml
-import os
-import sympy as sp
-
-sp
 
 from typing import List
 
+libsbml = util.LazyModule("libsbml")
+
+
 ZERO = "ZERO"
 UNDR1 = "UNDR1"
 UNDR2 = "UNDR2"
@@ -97,7 +88,7 @@ WARNING_CHECKS = []
 for i in range(1, 3):
     ALL_CHECKS.append(i)
     ERROR_CHECKS.append(i)
-for i in range(1001, 1007):
+for i in range(1001, 1008):
     ALL_CHECKS.append(i)
     WARNING_CHECKS.append(i)
 for i in range(1010, 1011):
@@ -112,33 +103,160 @@ for i in range(1030, 1038):
 for i in range(1040, 1045):
     ALL_CHECKS.append(i)
     WARNING_CHECKS.append(i)
-    
-messages_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "messages.json")
-with open(messages_path) as file:
-    MESSAGES = json.load(file)
+
+def _read_document(model_str, cache=None, converter=None):
+    """Reads a model into an SBML document. The format of a file is decided from its extension
+    or its first bytes, and SBML files are parsed by libsbml from the file directly. The model
+    of a zip, COMBINE or gzip archive is decompressed in memory.
+
+    Args:
+        model_str (str): Path to the model file or archive, or the SBML or Antimony string of the model.
+        cache (ResultCache): If given, the conversion of an Antimony model is looked up in and
+            stored to the persistent cache.
+        converter (AntimonyConverter): If given, an Antimony model is converted in the worker
+            processes of the converter.
+
+    Returns:
+        libsbml.SBMLDocument: The document.
+    """
+    is_file = model_files.is_path(model_str)
+    if is_file and model_files.is_archive(model_str):
+        model_str = model_files.read_archive_model(model_str)
+        is_file = False
+    if is_file:
+        if model_files.is_sbml_file(model_str):
+            document = libsbml.readSBMLFromFile(model_str)
+            if document.getModel() is None:
+                raise ValueError("Invalid SBML model.")
+            return document
+        # a failed loadAntimonyFile makes Antimony accept the next invalid string, the file is read here
+        # and the conversion is cached by content
+        with open(model_str, encoding='utf-8') as file:
+            xml = antimony_to_sbml(file.read(), cache, converter)
+        if xml is None:
+            raise ValueError("Invalid Antimony model.")
+    elif '<?xml' in model_str or model_str.lstrip().startswith('<'):
+        if '<sbml' not in model_str:
+            raise ValueError("Invalid SBML model.")
+        xml = model_str
+    elif model_str.endswith(model_files.MODEL_EXTENSIONS):
+        # the path to a model file that does not exist
+        raise ValueError("Invalid model_str format, should be SBML or Antimony string, or path to model file.")
+    else:
+        xml = antimony_to_sbml(model_str, cache, converter)
+        if xml is None:
+            raise ValueError("Invalid model_str format, should be SBML or Antimony string, or path to model file.")
+    return libsbml.readSBMLFromString(xml)
+
 
 @dataclass
 class ReactionData:
     reaction_id: str
     kinetics: str
-    kinetics_sim: str
     reactant_list: List[str]
     product_list: List[str]
     species_in_kinetic_law: List[str]
     parameters_in_kinetic_law: List[str]
     ids_list: List[str]
     sorted_species: List[str]
-    boundary_species: List[str]
     parameters_in_kinetic_law_only: List[str]
     compartment_in_kinetic_law: List[str]
     is_reversible: bool
     sbo_term: int
     codes: List[int]
-    non_constant_params: List[str]
+    is_too_complex: bool = False
+    # what the fields computed on first access are computed from, the reaction does not refer
+    # to its analyzer, so the model is freed with the analyzer without a garbage collection
+    symbol_table: SymbolTable = field(default=None, repr=False, compare=False)
+    time_budget: float = field(default=None, repr=False, compare=False)
+    sandbox: "Sandbox" = field(default=None, repr=False, compare=False)
+    # the digests of the classification libraries, and the default and custom classifications
+    # of the rate law made with them, reused by later checks
+    classifications: tuple = field(default=None, repr=False, compare=False)
+
+    # the fields below are computed on first access, so that checks that do not need
+    # them do not pay for them
+
+    @cached_property
+    def expression(self):
+        """The kinetic law parsed once for every check."""
+        return RateLawExpression(self.kinetics, self.ids_list)
+
+    @cached_property
+    def kinetics_sim(self):
+        """The simplified kinetic law, the kinetic law itself if it cannot be simplified.
+
+        Raises:
+            util.RateLawTimeout: If simplifying takes longer than the time budget of the reaction.
+        """
+        expression = self.expression
+        try:
+            with util.time_limit(self.time_budget):
+                if self.sandbox:
+                    expression.simplified = self.sandbox.run(simplify_kinetics, self.kinetics, self.ids_list)
+                simplified = expression.simplified
+        except util.RateLawTimeout:
+            self.is_too_complex = True
+            raise
+        except Exception:
+            expression.simplified = None
+            simplified = None
+        return self.kinetics if simplified is None else str(simplified)
+
+    @cached_property
+    def numerator_denominator(self):
+        """The numerator and denominator of the simplified kinetic law, None if it cannot be parsed.
+
+        Raises:
+            util.RateLawTimeout: If simplifying takes longer than the time budget of the reaction.
+        """
+        # simplifying the kinetics sets the simplified expression, in the sandbox if any
+        self.kinetics_sim
+        return self.expression.numerator_denominator
+
+    @cached_property
+    def boundary_species(self):
+        """The reactants and products that are boundary species."""
+        return [species for species in self.reactant_list + self.product_list
+                if self.symbol_table.is_boundary_species(species)]
+
+    @cached_property
+    def non_constant_params(self):
+        """The parameters in the kinetic law that are not constant."""
+        non_constant_params = []
+        for param in self.parameters_in_kinetic_law_only:
+            symbol = self.symbol_table.lookup(param, self.reaction_id)
+            if symbol and not symbol.is_constant:
+                non_constant_params.append(param)
+        return non_constant_params
+
+    def check_inputs(self):
+        """The fields of the reaction the checks read, except its id, in a JSON serializable list."""
+        return [
+            self.kinetics, self.ids_list, self.reactant_list, self.product_list, self.sorted_species,
+            self.species_in_kinetic_law, self.parameters_in_kinetic_law_only, self.compartment_in_kinetic_law,
+            self.boundary_species, self.non_constant_params, self.is_reversible, self.sbo_term,
+        ]
+
+    def fingerprint(self):
+        """A hash of the fields of the reaction the checks read, reactions with the same fingerprint
+        get the same messages."""
+        return hashlib.sha256(json.dumps(self.check_inputs()).encode()).hexdigest()
+
+    def __getstate__(self):
+        # a reaction is sent to the workers of a parallel analysis without the model, the
+        # fields read from the model should be computed before, the parsed kinetic law is not sent
+        state = dict(self.__dict__)
+        state["symbol_table"] = None
+        state["sandbox"] = None
+        for name in ("expression", "kinetics_sim", "numerator_denominator"):
+            state.pop(name, None)
+        return state
 
 
 class AnalyzerData:
-    def __init__(self, model_str: str, rate_law_classifications_path: str=None):
+    def __init__(self, model_str: str, rate_law_classifications_path: str=None, abort_on_complicated_rate_laws: bool=True, sandbox=None, cache=None,
+                 extraction_backend: str=SIMPLESBML, converter=None):
         """
         Initializes the AnalyzerData object.
 
@@ -146,6 +264,16 @@ class AnalyzerData:
             model_str (str): Path to the model file, or the string representation of model.
             rate_law_classifications_path (str): Path to the rate law classification file.
             customized rate law classification.
+            abort_on_complicated_rate_laws (bool): If True, a reaction is skipped when processing its
+                rate law takes longer than the time budget.
+            sandbox (Sandbox): If given, the expensive symbolic stages run in the worker processes
+                of the sandbox, which are killed when they exceed their time or memory limit.
+            cache (ResultCache): If given, the check outcomes of reactions, and the conversion of
+                an Antimony model, are looked up in and stored to the persistent cache.
+            extraction_backend (str): "simplesbml" to extract the reactions with SBMLKinetics,
+                "libsbml" to extract the same reactions with libsbml directly.
+            converter (AntimonyConverter): If given, an Antimony model is converted to SBML in
+                the worker processes of the converter.
 
         Examples:
             import Analyzer from ratesb_python.common.analyzer
@@ -160,41 +288,19 @@ class AnalyzerData:
             raise ValueError("Invalid model_str format, should be string.")
         if rate_law_classifications_path and not isinstance(rate_law_classifications_path, str):
             raise ValueError("Invalid rate_law_classifications_path format, should be string.")
-        # check if the model_str is sbml
-        if '<?xml' in model_str:
-            if '<sbml' not in model_str:
-                raise ValueError("Invalid SBML model.")
-            else:
-                xml = model_str
-        else:
-            # model_str is not sbml
-            load_int = antimony.loadAntimonyString(model_str)
-            if load_int > 0:
-                xml = antimony.getSBMLString()
-            elif model_str.endswith('.ant') or model_str.endswith('.txt') or model_str.endswith('.xml'):
-                # model_str is path to model
-                xml = ''
-                if model_str.endswith('.ant') or model_str.endswith('.txt'):
-                    ant = util.get_model_str(model_str, False)
-                    load_int = antimony.loadAntimonyString(ant)
-                    if load_int > 0:
-                        xml = antimony.getSBMLString()
-                    else:
-                        raise ValueError("Invalid Antimony model.")
-                else:
-                    xml = util.get_model_str(model_str, True)
-            else:
-                raise ValueError("Invalid model_str format, should be SBML or Antimony string, or path to model file.")
-        reader = libsbml.SBMLReader()
-        document = reader.readSBMLFromString(xml)
+        document = _read_document(model_str, cache, converter)
         util.checkSBMLDocument(document)
         self.model = document.getModel()
-        self.simple = SimpleSBML(self.model)
+        self.symbol_table = SymbolTable(self.model)
         self.custom_classifier = None
         self.default_classifications = {}
         self.custom_classifications = {}
         self.results = Results()
         self.errors = []
+        # time budget of each reaction in seconds
+        self.time_budget = TIMEOUT if abort_on_complicated_rate_laws else None
+        self.sandbox = sandbox
+        self.cache = cache
         default_classifier_path = os.path.join(current_dir, "default_classifier.json")
         self.default_classifier = _CustomClassifier(default_classifier_path)
 
@@ -204,126 +310,195 @@ class AnalyzerData:
             if len(self.custom_classifier.warning_message) > 0:
                 print(self.custom_classifier.warning_message)
         
-        self.reactions = []
-        for reaction in self.simple.reactions:
-            reaction.kinetic_law.formula = reaction.kinetic_law.formula.replace(
-                '^', '**')
-            ids_list = list(dict.fromkeys(reaction.kinetic_law.symbols))
-
-            libsbml_kinetics = reaction.kinetic_law.libsbml_kinetics
-            sbo_term = -1
-            if libsbml_kinetics:
-                sbo_term = libsbml_kinetics.getSBOTerm()
-
-            reaction_id = reaction.getId()
-            sorted_species = self._get_sorted_species(reaction.reaction)
-            species_list, parameter_list, local_parameter_list, compartment_list, kinetics, kinetics_sim = self._preprocess_reactions(
-                reaction)
-            reactant_list, product_list = self._extract_kinetics_details(
-                reaction)
-            species_in_kinetic_law, parameters_in_kinetic_law_only, compartment_in_kinetic_law, others_in_kinetic_law = self._identify_parameters_in_kinetics(
-                ids_list, species_list, parameter_list, local_parameter_list, compartment_list)
-            boundary_species = self._get_boundary_species(
-                reactant_list, product_list)
-            non_constant_params = self._get_non_constant_params(parameters_in_kinetic_law_only)
-            
-            is_reversible = reaction.reaction.getReversible()
-            
-            codes = []
-            
-            data = ReactionData(
-                reaction_id=reaction_id,
-                kinetics=kinetics,
-                kinetics_sim=kinetics_sim,
-                reactant_list=reactant_list,
-                product_list=product_list,
-                species_in_kinetic_law=species_in_kinetic_law,
-                parameters_in_kinetic_law=parameters_in_kinetic_law_only + others_in_kinetic_law,
-                ids_list=ids_list,
-                sorted_species=sorted_species,
-                boundary_species=boundary_species,
-                parameters_in_kinetic_law_only=parameters_in_kinetic_law_only,
-                compartment_in_kinetic_law=compartment_in_kinetic_law,
-                is_reversible=is_reversible,
-                sbo_term=sbo_term,
-                codes=codes,
-                non_constant_params=non_constant_params
-            )
-            
-            self.reactions.append(data)
-
-    def _get_sorted_species(self, reaction):
-        sorted_species_reference = [reaction.getReactant(n) for n in range(
-            reaction.getNumReactants())] + [reaction.getProduct(n) for n in range(reaction.getNumProducts())]
-        sorted_species = []
-        for species_reference in sorted_species_reference:
-            sorted_species.append(species_reference.getSpecies())
-        return sorted_species
-
-    def _preprocess_reactions(self, reaction):
-        # Extract and process necessary data from the reaction
-        species_num = self.model.getNumSpecies()
-        parameter_num = self.model.getNumParameters()
-        compartment_num = self.model.getNumCompartments()
-
-        species_list = [self.model.getSpecies(
-            i).getId() for i in range(species_num)]
-        parameter_list = [self.model.getParameter(
-            i).getId() for i in range(parameter_num)]
-        local_parameter_list= (
-            [reaction.kinetic_law.libsbml_kinetics.getLocalParameter(i).getId() for i in range(reaction.kinetic_law.libsbml_kinetics.getNumLocalParameters())])
-        compartment_list = [self.model.getCompartment(
-            i).getId() for i in range(compartment_num)]
-
-        kinetics = reaction.kinetic_law.expanded_formula
+        self.reactions = [self._reaction_data(reaction) for reaction in extract_reactions(self.model, extraction_backend)]
 
-        try:
-            kinetics_sim = str(sp.simplify(kinetics))
-        except:
-            kinetics_sim = kinetics
+    def _reaction_data(self, reaction):
+        """
+        Builds the analysis data of a reaction.
+
+        Args:
+            reaction (ExtractedReaction): The reaction, as extracted from the model.
+
+        Returns:
+            ReactionData: The analysis data of the reaction.
+        """
+        reaction_id = reaction.reaction_id
+        species_in_kinetic_law, parameters_in_kinetic_law_only, compartment_in_kinetic_law, others_in_kinetic_law = self._identify_parameters_in_kinetics(
+            reaction.ids_list, reaction_id)
+        return ReactionData(
+            reaction_id=reaction_id,
+            kinetics=reaction.kinetics,
+            reactant_list=reaction.reactant_list,
+            product_list=reaction.product_list,
+            species_in_kinetic_law=species_in_kinetic_law,
+            parameters_in_kinetic_law=parameters_in_kinetic_law_only + others_in_kinetic_law,
+            ids_list=reaction.ids_list,
+            sorted_species=reaction.sorted_species,
+            parameters_in_kinetic_law_only=parameters_in_kinetic_law_only,
+            compartment_in_kinetic_law=compartment_in_kinetic_law,
+            is_reversible=reaction.is_reversible,
+            sbo_term=reaction.sbo_term,
+            codes=[],
+            symbol_table=self.symbol_table,
+            time_budget=self.time_budget,
+            sandbox=self.sandbox,
+        )
+
+    def _reaction_index(self, reaction_id):
+        for index, data in enumerate(self.reactions):
+            if data.reaction_id == reaction_id:
+                return index
+        raise ValueError(f"Reaction {reaction_id} not found.")
+
+    def _set_kinetic_law(self, reaction, kinetics):
+        kinetic_law = reaction.getKineticLaw() or reaction.createKineticLaw()
+        if len(kinetics.strip()) == 0:
+            kinetic_law.setMath(None)
+            return
+        math = libsbml.parseL3Formula(kinetics)
+        if math is None:
+            raise ValueError(f"Invalid kinetic law: {libsbml.getLastParseL3Error()}")
+        kinetic_law.setMath(math)
+
+    def update_reaction(self, reaction_id: str, kinetics: str):
+        """
+        Replaces the kinetic law of a reaction in the model, and rebuilds the analysis data
+        of that reaction only.
+
+        Args:
+            reaction_id (str): The id of the reaction.
+            kinetics (str): The new kinetic law, in SBML Level 3 infix syntax.
+
+        Returns:
+            int: The index of the reaction.
+        """
+        index = self._reaction_index(reaction_id)
+        reaction = self.model.getReaction(reaction_id)
+        self._set_kinetic_law(reaction, kinetics)
+        self.reactions[index] = self._reaction_data(extract_reaction(reaction, get_function_definitions(self.model)))
+        return index
+
+    def add_reaction(self, reaction_id: str, reactant_list: List[str], product_list: List[str], kinetics: str,
+                     is_reversible: bool=False):
+        """
+        Adds a reaction to the end of the model, and builds its analysis data.
+
+        Args:
+            reaction_id (str): The id of the reaction.
+            reactant_list (List[str]): The ids of the reactant species.
+            product_list (List[str]): The ids of the product species.
+            kinetics (str): The kinetic law, in SBML Level 3 infix syntax.
+            is_reversible (bool): Whether the reaction is reversible.
+
+        Returns:
+            int: The index of the reaction.
+        """
+        if self.model.getReaction(reaction_id) is not None:
+            raise ValueError(f"Reaction {reaction_id} already exists.")
+        reaction = libsbml.Reaction(self.model.getLevel(), self.model.getVersion())
+        reaction.setId(reaction_id)
+        reaction.setReversible(is_reversible)
+        if self.model.getLevel() > 2:
+            reaction.setFast(False)
+        for species, create in [(reactant_list, reaction.createReactant), (product_list, reaction.createProduct)]:
+            for species_id in species:
+                species_reference = create()
+                species_reference.setSpecies(species_id)
+                species_reference.setStoichiometry(1)
+                if self.model.getLevel() > 2:
+                    species_reference.setConstant(True)
+        self._set_kinetic_law(reaction, kinetics)
+        self.model.addReaction(reaction)
+        reaction = self.model.getReaction(reaction_id)
+        self.reactions.append(self._reaction_data(extract_reaction(reaction, get_function_definitions(self.model))))
+        return len(self.reactions) - 1
+
+    def remove_reaction(self, reaction_id: str):
+        """
+        Removes a reaction from the model and its analysis data.
+
+        Args:
+            reaction_id (str): The id of the reaction.
+        """
+        index = self._reaction_index(reaction_id)
+        self.model.removeReaction(reaction_id)
+        self.symbol_table.local_parameters.pop(reaction_id, None)
+        del self.reactions[index]
+
+    @classmethod
+    def _detached(cls, rate_law_classifications_path, time_budget):
+        """
+        Creates analysis data without a model, for the reactions sent to a worker process
+        of a parallel analysis.
+
+        Args:
+            rate_law_classifications_path (str): Path to the rate law classification file.
+            time_budget (float): Time budget of each reaction in seconds, None for no limit.
 
-        return species_list, parameter_list, local_parameter_list, compartment_list, kinetics, kinetics_sim
+        Returns:
+            AnalyzerData: The analysis data, without reactions.
+        """
+        data = cls.__new__(cls)
+        data.model = None
+        data.symbol_table = None
+        data.default_classifier = _CustomClassifier(os.path.join(current_dir, "default_classifier.json"))
+        data.custom_classifier = _CustomClassifier(rate_law_classifications_path) if rate_law_classifications_path else None
+        data.default_classifications = {}
+        data.custom_classifications = {}
+        data.results = Results()
+        data.errors = []
+        data.time_budget = time_budget
+        data.sandbox = None
+        data.cache = None
+        data.reactions = []
+        return data
+
+    def _stoichiometry(self, reaction_id):
+        """
+        Reads the stoichiometry of a reaction from the model, the checks do not read it.
 
-    def _extract_kinetics_details(self, reaction):
-        reactant_list = [r.getSpecies() for r in reaction.reactants]
-        product_list = [p.getSpecies() for p in reaction.products]
-        return reactant_list, product_list
+        Args:
+            reaction_id (str): The id of the reaction.
 
-    def _identify_parameters_in_kinetics(self, ids_list, species_list, parameter_list, local_parameter_list, compartment_list):
+        Returns:
+            tuple: The (species, stoichiometry, stoichiometry formula) of each reactant, then of
+                each product, the stoichiometry is None if not set and the formula is the
+                stoichiometry math or the rule of the species reference, None if there is none.
+        """
+        reaction = self.model.getReaction(reaction_id)
+        stoichiometry = []
+        for references in [reaction.getListOfReactants(), reaction.getListOfProducts()]:
+            species_stoichiometry = []
+            for reference in references:
+                math = None
+                if reference.isSetStoichiometryMath() and reference.getStoichiometryMath().isSetMath():
+                    math = reference.getStoichiometryMath().getMath()
+                elif reference.isSetId() and self.model.getRule(reference.getId()) is not None:
+                    math = self.model.getRule(reference.getId()).getMath()
+                species_stoichiometry.append((
+                    reference.getSpecies(),
+                    reference.getStoichiometry() if reference.isSetStoichiometry() else None,
+                    libsbml.formulaToL3String(math) if math is not None else None))
+            stoichiometry.append(tuple(species_stoichiometry))
+        return tuple(stoichiometry)
+
+    def _identify_parameters_in_kinetics(self, ids_list, reaction_id):
         species_in_kinetic_law = []
         parameters_in_kinetic_law_only = []
         compartment_in_kinetic_law = []
         others_in_kinetic_law = []
 
         for id in ids_list:
-            if id in species_list:
+            symbol = self.symbol_table.lookup(id, reaction_id)
+            kind = symbol.kind if symbol else None
+            if kind == SPECIES:
                 species_in_kinetic_law.append(id)
-            elif id in parameter_list:
-                parameters_in_kinetic_law_only.append(id)
-            elif id in local_parameter_list:
+            elif kind == PARAMETER or kind == LOCAL_PARAMETER:
                 parameters_in_kinetic_law_only.append(id)
-            elif id in compartment_list:
+            elif kind == COMPARTMENT:
                 compartment_in_kinetic_law.append(id)
                 others_in_kinetic_law.append(id)
             else:
                 others_in_kinetic_law.append(id)
 
         return species_in_kinetic_law, parameters_in_kinetic_law_only, compartment_in_kinetic_law, others_in_kinetic_law
-
-    def _get_boundary_species(self, reactant_list, product_list):
-        boundary_species = [reactant for reactant in reactant_list if self.model.getSpecies(
-            reactant).getBoundaryCondition()]
-        boundary_species += [product for product in product_list if self.model.getSpecies(
-            product).getBoundaryCondition()]
-        return boundary_species
-
-    def _get_non_constant_params(self, parameters_in_kinetic_law_only):
-        non_constant_params = []
-        for param in parameters_in_kinetic_law_only:
-            try:
-                libsbml_param = self.model.getParameter(param)
-                if libsbml_param and not libsbml_param.getConstant():
-                    non_constant_params.append(param)
-            except:
-                pass
-        return non_constant_params
\ No newline at end of file
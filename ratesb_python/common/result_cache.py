@@ -0,0 +1,200 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# bumped whenever the checks change the messages they report for the same reaction
+CACHE_FORMAT_VERSION = 1
+# number of insertions between two checks of the size of the cache
+_EVICTION_INTERVAL = 64
+# fraction of the size limit the cache is shrunk to when it exceeds the limit
+_EVICTION_TARGET = 0.9
+
+
+def _package_version(name="ratesb_python"):
+    from importlib.metadata import version, PackageNotFoundError
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+class ResultCache:
+    """
+    A persistent cache of the check outcomes of reactions, stored in an SQLite file. The
+    outcomes of a reaction are keyed by a hash of everything the checks read: the kinetic
+    law, the roles of the ids in it, the requested codes, the content of the classification
+    files and the library version. The reaction id is not part of the key, so a rate law
+    repeated across models is checked once. Reactions that exceeded their time budget are
+    not cached. The SBML conversions of Antimony models are cached as well, keyed by the
+    hash of the model and the Antimony version.
+
+    When the file grows beyond its size limit, the least recently used entries are evicted.
+    A cache can be shared by several analyzers and processes, and pickled into the workers
+    of a batch, each of which opens its own connection.
+
+    Examples:
+        cache = ResultCache("path/to/cache.sqlite", max_size=512 * 1024 ** 2)
+        results = check_model("path/to/biomodel.xml", cache=cache)
+    """
+
+    def __init__(self, path: str, max_size: int=1024 ** 3):
+        """
+        Initializes the ResultCache class, the file is created on first use.
+
+        Args:
+            path (str): Path to the SQLite file.
+            max_size (int): Size limit of the cached outcomes in bytes.
+        """
+        if max_size < 1:
+            raise ValueError("max_size should be at least 1.")
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._num_puts = 0
+        self._lock = threading.Lock()
+        self._version = "%s/%s" % (_package_version(), CACHE_FORMAT_VERSION)
+        self._antimony_version = None
+
+    def __getstate__(self):
+        return {"path": self.path, "max_size": self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["max_size"])
+
+    def key(self, data, codes, classifier_digests):
+        """
+        Computes the key of the check outcomes of a reaction.
+
+        Args:
+            data (ReactionData): The reaction.
+            codes (List[int]): The codes of the checks to perform.
+            classifier_digests (list): The digests of the classification files in use.
+
+        Returns:
+            str: The key.
+        """
+        content = [self._version, classifier_digests, sorted(codes)] + data.check_inputs()
+        return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+    def conversion_key(self, antimony_str):
+        """
+        Computes the key of the SBML conversion of an Antimony model.
+
+        Args:
+            antimony_str (str): The Antimony model.
+
+        Returns:
+            str: The key.
+        """
+        if self._antimony_version is None:
+            self._antimony_version = _package_version("antimony")
+        content = [self._version, "antimony", self._antimony_version, antimony_str]
+        return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+    def get(self, key: str):
+        """
+        Looks up the check outcomes of a reaction.
+
+        Args:
+            key (str): The key of the reaction.
+
+        Returns:
+            dict: The outcomes, None if they are not cached.
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        """
+        Stores the check outcomes of a reaction.
+
+        Args:
+            key (str): The key of the reaction.
+            value (dict): The outcomes, serializable as JSON.
+        """
+        value = json.dumps(value)
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                               (key, value, len(value), time.time()))
+            self._num_puts += 1
+            if self._num_puts % _EVICTION_INTERVAL == 0:
+                self._evict(connection)
+
+    def evict(self):
+        """
+        Evicts the least recently used entries until the cache is within its size limit.
+        """
+        with self._lock:
+            self._evict(self._connect())
+
+    def clear(self):
+        """
+        Removes every entry.
+        """
+        with self._lock:
+            self._connect().execute("DELETE FROM entries")
+
+    def size(self):
+        """
+        Returns the size of the cached outcomes in bytes.
+        """
+        with self._lock:
+            return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def close(self):
+        """
+        Evicts entries beyond the size limit and closes the connection, if any.
+        """
+        with self._lock:
+            if self._connection is None:
+                return
+            self._evict(self._connection)
+            self._connection.close()
+            self._connection = None
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _connect(self):
+        if self._connection is None:
+            # in autocommit mode, the processes sharing the file wait for each other's writes
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS entries "
+                               "(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self._connection = connection
+        return self._connection
+
+    def _evict(self, connection):
+        size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if size <= self.max_size:
+            return
+        excess = size - int(self.max_size * _EVICTION_TARGET)
+        keys = []
+        for key, entry_size in connection.execute("SELECT key, size FROM entries ORDER BY last_used, rowid"):
+            keys.append((key,))
+            excess -= entry_size
+            if excess <= 0:
+                break
+        connection.executemany("DELETE FROM entries WHERE key = ?", keys)
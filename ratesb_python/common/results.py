@@ -1,4 +1,6 @@
 from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List
 
 class Results:
     """
@@ -108,6 +110,39 @@ class Results:
                     self._num_errors -= 1
             del self._results[reaction_name]
         
+    def replace_messages_by_reaction(self, reaction_name: str, messages: list, next_reaction_names=()):
+        """
+        Replaces the messages of a reaction, keeping the place of the reaction among the others.
+
+        Args:
+            reaction_name (str): The name of the reaction.
+            messages (list): The new messages, as returned by get_messages_by_reaction.
+            next_reaction_names (Iterable[str]): The names of the reactions after it, in order. A
+                reaction that had no messages is placed before those of them that have messages.
+
+        Raises:
+            None
+        """
+        for message in self._results.get(reaction_name, []):
+            if message['is_warning']:
+                self._num_warnings -= 1
+            else:
+                self._num_errors -= 1
+        for message in messages:
+            if message['is_warning']:
+                self._num_warnings += 1
+            else:
+                self._num_errors += 1
+        if len(messages) == 0:
+            self._results.pop(reaction_name, None)
+            return
+        is_new = reaction_name not in self._results
+        self._results[reaction_name] = [dict(message) for message in messages]
+        if is_new:
+            for name in next_reaction_names:
+                if name in self._results:
+                    self._results.move_to_end(name)
+
     def count_messages(self):
         """
         Counts the total number of messages (errors and warnings).
@@ -155,4 +190,39 @@ class Results:
                     str_repr += f'  Warning {str(code)}: {message_body}\n'
                 else:
                     str_repr += f'  Error 000{str(code)}: {message_body}\n'
-        return str_repr
\ No newline at end of file
+        return str_repr
+
+@dataclass
+class ModelDiff:
+    """
+    The difference between the results of two versions of a model. Reactions are matched by
+    id, and a reaction whose id is new but whose stoichiometry and checked fields are those
+    of a removed reaction is a renamed reaction. Only the added and modified reactions are checked in the
+    new version, and only the removed and modified reactions in the old version, so the
+    messages of the unchanged reactions are not part of the difference.
+    """
+    added_reactions: List[str] = field(default_factory=list)
+    removed_reactions: List[str] = field(default_factory=list)
+    modified_reactions: List[str] = field(default_factory=list)
+    # by their id in the new version, renamed reactions included
+    unchanged_reactions: List[str] = field(default_factory=list)
+    # the messages of the new version that the old version did not report
+    new_messages: Results = field(default_factory=Results)
+    # the messages of the old version that the new version does not report
+    resolved_messages: Results = field(default_factory=Results)
+    # the messages of the modified reactions that both versions report, the messages of the
+    # unchanged reactions are not computed
+    persisting_messages: Results = field(default_factory=Results)
+    # the errors that stopped the checks of either version
+    errors: List[str] = field(default_factory=list)
+
+    def __repr__(self):
+        """
+        Returns a string representation of the difference.
+
+        Returns:
+            str: The new, resolved and persisting messages.
+        """
+        return (f'New:\n{self.new_messages}\n'
+                f'Resolved:\n{self.resolved_messages}\n'
+                f'Persisting:\n{self.persisting_messages}')
@@ -0,0 +1,203 @@
+import multiprocessing
+import threading
+import sys
+import os
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
+if current_dir not in sys.path:
+    sys.path.append(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from custom_classifier import _CustomClassifier, TIMEOUT
+from expression import RateLawExpression
+from common import util
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def simplify_kinetics(kinetics, ids_list):
+    """Simplifies a kinetic law, run in a sandbox worker.
+
+    Args:
+        kinetics (str): The kinetic law.
+        ids_list (list): The ids in the kinetic law.
+
+    Returns:
+        sympy.Expr: The simplified kinetic law, None if it cannot be parsed.
+    """
+    return RateLawExpression(kinetics, ids_list).simplified
+
+
+def compile_library(rate_law_classifications_path):
+    """Compiles a classification library in a sandbox worker, so that it is shared by the
+    classifications the worker runs afterwards.
+
+    Args:
+        rate_law_classifications_path (str): Path to the rate law classification file.
+    """
+    _CustomClassifier(rate_law_classifications_path).compile_library()
+
+
+def classify(rate_law_classifications_path, is_default, kwargs):
+    """Classifies a rate law, run in a sandbox worker.
+
+    Args:
+        rate_law_classifications_path (str): Path to the rate law classification file.
+        is_default (bool): Whether the classification file is the default one.
+        kwargs (dict): The reaction data passed to _CustomClassifier.custom_classify.
+
+    Returns:
+        dict: The classification of the rate law.
+    """
+    return _CustomClassifier(rate_law_classifications_path).custom_classify(is_default=is_default, **kwargs)
+
+
+def _worker_main(connection, memory_limit):
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        func, args = task
+        try:
+            connection.send((True, func(*args)))
+        except MemoryError:
+            # the memory of the worker might be in a bad state, let the parent start a new one
+            return
+        except Exception as e:
+            connection.send((False, "%s: %s" % (type(e).__name__, e)))
+
+
+class Sandbox:
+    """
+    Runs the expensive symbolic stages of rate law processing in supervised worker
+    processes. A worker that takes longer than the time limit is killed, and a worker that
+    runs out of its memory limit exits, in both cases the rate law is reported as too
+    complex and a new worker takes over. Workers are also recycled after a number of tasks.
+
+    A sandbox can be shared by several analyzers, also across threads, in which case the
+    tasks run one at a time. It should be closed when no longer needed, e.g. by using it
+    as a context manager.
+
+    Examples:
+        with Sandbox(time_limit=10, memory_limit=2 * 1024 ** 3) as sandbox:
+            results = check_model("path/to/biomodel.xml", sandbox=sandbox)
+    """
+
+    def __init__(self, time_limit: float=TIMEOUT, memory_limit: int=None, max_tasks_per_worker: int=100):
+        """
+        Initializes the Sandbox class, the worker is started on first use.
+
+        Args:
+            time_limit (float): Wall-clock limit of each task in seconds.
+            memory_limit (int): Address space limit of the worker in bytes, no limit if None.
+                Not supported on Windows.
+            max_tasks_per_worker (int): Number of tasks after which the worker is replaced.
+        """
+        if max_tasks_per_worker < 1:
+            raise ValueError("max_tasks_per_worker should be at least 1.")
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._process = None
+        self._connection = None
+        self._num_tasks = 0
+        self._setups = set()
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def run(self, func, *args, setup=None):
+        """
+        Runs func(*args) in the worker.
+
+        Args:
+            func (callable): A picklable function.
+            args: Picklable arguments of func.
+            setup (tuple): A picklable (function, arguments) pair run without time limit before
+                func, once per worker, e.g. to compile data shared by the tasks.
+
+        Returns:
+            The return value of func.
+
+        Raises:
+            util.RateLawTimeout: If the worker exceeds its time or memory limit.
+            RuntimeError: If func raises an exception.
+        """
+        with self._lock:
+            if self._process is not None and self._num_tasks >= self.max_tasks_per_worker:
+                self.close()
+            if self._process is None:
+                self._start()
+            if setup is not None and setup not in self._setups:
+                self._setups.add(setup)
+                self._call(setup[0], setup[1], None)
+            self._num_tasks += 1
+            return self._call(func, args, self.time_limit)
+
+    def close(self):
+        """
+        Stops the worker, if any.
+        """
+        with self._lock:
+            if self._process is None:
+                return
+            try:
+                self._connection.send(None)
+            except (OSError, ValueError):
+                pass
+            self._process.join(1)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._connection.close()
+            self._process = None
+            self._connection = None
+
+    def _start(self):
+        self._connection, child_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_worker_main, args=(child_connection, self.memory_limit), daemon=True)
+        self._process.start()
+        child_connection.close()
+        self._num_tasks = 0
+        self._setups = set()
+
+    def _kill(self):
+        self._process.kill()
+        self._process.join()
+        self._connection.close()
+        self._process = None
+        self._connection = None
+
+    def _call(self, func, args, time_limit):
+        try:
+            self._connection.send((func, args))
+            is_ready = self._connection.poll(time_limit)
+            if is_ready:
+                is_success, result = self._connection.recv()
+        except (EOFError, OSError):
+            # the worker exited, e.g. after running out of memory
+            self._kill()
+            raise util.RateLawTimeout()
+        except BaseException:
+            # interrupted while the worker is busy, its result would be read by the next task
+            self._kill()
+            raise
+        if not is_ready:
+            self._kill()
+            raise util.RateLawTimeout()
+        if not is_success:
+            raise RuntimeError(result)
+        return result
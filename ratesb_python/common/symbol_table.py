@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from typing import Optional
+
+SPECIES = "species"
+PARAMETER = "parameter"
+COMPARTMENT = "compartment"
+LOCAL_PARAMETER = "local_parameter"
+
+
+@dataclass
+class Symbol:
+    id: str
+    kind: str
+    is_boundary: bool = False
+    is_constant: bool = True
+    # the reaction whose kinetic law defines a local parameter, None for global symbols
+    reaction_id: Optional[str] = None
+
+
+class SymbolTable:
+    """
+    The species, parameters, compartments and local parameters of a model, indexed by id.
+    The table is built in one pass over the libsbml model, so that the reactions look up
+    their symbols instead of scanning the model.
+    """
+
+    def __init__(self, model):
+        """
+        Initializes the SymbolTable object.
+
+        Args:
+            model (libsbml.Model): The model.
+        """
+        self.symbols = {}
+        self.local_parameters = {}
+        for i in range(model.getNumCompartments()):
+            compartment = model.getCompartment(i)
+            self.symbols[compartment.getId()] = Symbol(
+                compartment.getId(), COMPARTMENT, is_constant=compartment.getConstant())
+        for i in range(model.getNumParameters()):
+            parameter = model.getParameter(i)
+            self.symbols[parameter.getId()] = Symbol(
+                parameter.getId(), PARAMETER, is_constant=parameter.getConstant())
+        # species last, a species id takes precedence over a global id of another kind
+        for i in range(model.getNumSpecies()):
+            species = model.getSpecies(i)
+            self.symbols[species.getId()] = Symbol(
+                species.getId(), SPECIES, is_boundary=species.getBoundaryCondition(), is_constant=species.getConstant())
+        for i in range(model.getNumReactions()):
+            reaction = model.getReaction(i)
+            kinetic_law = reaction.getKineticLaw()
+            local_parameters = {}
+            if kinetic_law:
+                for j in range(kinetic_law.getNumLocalParameters()):
+                    parameter = kinetic_law.getLocalParameter(j)
+                    local_parameters[parameter.getId()] = Symbol(
+                        parameter.getId(), LOCAL_PARAMETER, reaction_id=reaction.getId())
+            self.local_parameters[reaction.getId()] = local_parameters
+
+    def lookup(self, symbol_id: str, reaction_id: str=None):
+        """
+        Looks up a symbol, the local parameters of the reaction shadow the global symbols.
+
+        Args:
+            symbol_id (str): The id of the symbol.
+            reaction_id (str): The reaction whose kinetic law the symbol appears in, if any.
+
+        Returns:
+            Symbol: The symbol, None if the model does not define it.
+        """
+        if reaction_id is not None:
+            local_parameters = self.local_parameters.get(reaction_id, {})
+            if symbol_id in local_parameters:
+                return local_parameters[symbol_id]
+        return self.symbols.get(symbol_id)
+
+    def is_boundary_species(self, symbol_id: str):
+        """
+        Checks if a symbol is a boundary species.
+
+        Args:
+            symbol_id (str): The id of the symbol.
+
+        Returns:
+            bool: True if the symbol is a species with a boundary condition.
+        """
+        symbol = self.symbols.get(symbol_id)
+        return symbol is not None and symbol.kind == SPECIES and symbol.is_boundary
@@ -1,7 +1,106 @@
+import importlib
+import json
 import os
 import math
 import random
-import sympy as sp
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+
+class LazyModule:
+    """A module imported on first attribute access.
+
+    The heavy dependencies (sympy, numpy, libsbml, antimony) are bound to lazy modules, so
+    that importing ratesb_python does not import them before they are used.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            # imports are serialized by the import lock, concurrent first uses are safe
+            module = importlib.import_module(self._name)
+            self._module = module
+        return getattr(module, attr)
+
+
+np = LazyModule("numpy")
+sp = LazyModule("sympy")
+
+# seed of the sample points used to fingerprint expressions
+FINGERPRINT_SEED = 0
+# sample values of every symbol used in fingerprints, keyed by symbol name
+_FINGERPRINT_VALUES = {}
+# values of a species when checking the sign of the derivative of a kinetics to it
+DERIVATIVE_SAMPLES = [i / 100 for i in range(1, 1001, 10)]
+
+
+@lru_cache(maxsize=None)
+def get_messages():
+    """Loads the descriptions of the checks, once per process.
+
+    Returns:
+        dict: The descriptions of the error and warning checks, keyed by their codes.
+    """
+    messages_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "messages.json")
+    with open(messages_path) as file:
+        return json.load(file)
+
+class RateLawTimeout(BaseException):
+    """Raised when processing a rate law exceeds its time or memory budget.
+
+    Derives from BaseException so that the broad exception handlers around sympy calls
+    do not swallow it.
+    """
+
+@contextmanager
+def time_limit(seconds):
+    """limit the time spent in a block of code
+
+    In the main thread the block is interrupted with SIGALRM once the limit is reached.
+    Elsewhere, or on platforms without SIGALRM, the block runs to completion and the
+    limit is checked when it returns. Limits can be nested, the inner block is also
+    interrupted by the limit of the outer block.
+
+    Args:
+        seconds (float): the time limit in seconds, no limit if None
+
+    Raises:
+        RateLawTimeout: if the block takes longer than the limit
+    """
+    if seconds is None:
+        yield
+        return
+    if not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        start = time.monotonic()
+        yield
+        if time.monotonic() - start > seconds:
+            raise RateLawTimeout()
+        return
+
+    def handler(signum, frame):
+        raise RateLawTimeout()
+
+    previous_handler = signal.signal(signal.SIGALRM, handler)
+    previous_delay = signal.getitimer(signal.ITIMER_REAL)[0]
+    start = time.monotonic()
+    delay = min(seconds, previous_delay) if previous_delay > 0 else seconds
+    # a zero delay would disable the timer
+    signal.setitimer(signal.ITIMER_REAL, max(delay, 1e-6))
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+        if previous_delay > 0:
+            # resume the limit of the outer block, firing right away if it has passed
+            signal.setitimer(signal.ITIMER_REAL, max(previous_delay - (time.monotonic() - start), 1e-6))
 
 def get_model_str(model_reference, is_sbml):
     """
@@ -45,6 +144,44 @@ def checkSBMLDocument(document):
     if (document.getNumErrors() > 0):
         print("SBML Document Error")
     
+class CompiledExpression:
+    """A sympy expression lambdified once so that it can be evaluated many times.
+
+    Attributes:
+        expr (sympy.Expr): the compiled expression
+        symbols (list): the free symbols of the expression, in argument order
+    """
+    def __init__(self, expr, symbols=None, func=None):
+        self.expr = expr
+        if func is None:
+            symbols = sorted(expr.free_symbols, key=str)
+            func = sp.lambdify(symbols, expr, "numpy")
+        self.symbols = symbols
+        self.func = func
+
+    def xreplace(self, mapping):
+        """rename symbols of the expression without compiling it again
+
+        Args:
+            mapping (dict): new symbol of the renamed symbols, keyed by the old symbol
+
+        Returns:
+            CompiledExpression: the renamed expression, sharing the compiled function
+        """
+        symbols = [mapping.get(symbol, symbol) for symbol in self.symbols]
+        return CompiledExpression(self.expr.xreplace(mapping), symbols, self.func)
+
+    def evaluate(self, values):
+        """evaluate the expression
+
+        Args:
+            values (dict): value of every free symbol of the expression, keyed by symbol
+
+        Returns:
+            the value of the expression
+        """
+        return self.func(*[values[symbol] for symbol in self.symbols])
+
 def check_equal(expr1, expr2, n=4, sample_min=1, sample_max=10):
     """check if two sympy expressions are equal by plugging random numbers
     into each symbols in both expressions and test if they are equal
@@ -56,28 +193,73 @@ def check_equal(expr1, expr2, n=4, sample_min=1, sample_max=10):
         sample_min (int, optional): the minimum of random number. Defaults to 1.
         sample_max (int, optional): the maximum of random number. Defaults to 10.
     
+    Returns:
+        bool: if the two expressions are equal
+    """
+    return check_compiled_equal(CompiledExpression(expr1), CompiledExpression(expr2), n, sample_min, sample_max)
+
+def check_compiled_equal(compiled1, compiled2, n=4, sample_min=1, sample_max=10):
+    """same as check_equal, for expressions that are already compiled
+
+    Args:
+        compiled1 (CompiledExpression): first expression to compare
+        compiled2 (CompiledExpression): second expression to compare
+        n (int, optional): number of test to perform. Defaults to 4.
+        sample_min (int, optional): the minimum of random number. Defaults to 1.
+        sample_max (int, optional): the maximum of random number. Defaults to 10.
+
     Returns:
         bool: if the two expressions are equal
     """
     # Regroup all free symbols from both expressions
-    free_symbols = list(set(expr1.free_symbols) | set(expr2.free_symbols))
-    
-    # Precompile expressions to numerical functions for faster evaluation
-    expr1_func = sp.lambdify(free_symbols, expr1, "numpy")
-    expr2_func = sp.lambdify(free_symbols, expr2, "numpy")
+    free_symbols = set(compiled1.symbols) | set(compiled2.symbols)
 
     for i in range(n):
-        your_values = [random.uniform(sample_min, sample_max) for _ in range(len(free_symbols))]
-        
+        your_values = {symbol: random.uniform(sample_min, sample_max) for symbol in free_symbols}
+
         # Evaluate both expressions with the generated values
-        expr1_num = expr1_func(*your_values)
-        expr2_num = expr2_func(*your_values)
-        
+        expr1_num = compiled1.evaluate(your_values)
+        expr2_num = compiled2.evaluate(your_values)
+
         # Check for numerical closeness
         if not math.isclose(expr1_num, expr2_num, rel_tol=1e-9):
             return False
     return True
 
+def fingerprint(compiled, n=4, sample_min=1, sample_max=10, digits=6):
+    """evaluate a compiled expression at a fixed set of sample points, so that equal
+    expressions have equal fingerprints. Every symbol takes the same seeded values
+    in every fingerprint, whatever expression it appears in.
+
+    Args:
+        compiled (CompiledExpression): the expression to fingerprint
+        n (int, optional): number of sample points. Defaults to 4.
+        sample_min (int, optional): the minimum of the sample values. Defaults to 1.
+        sample_max (int, optional): the maximum of the sample values. Defaults to 10.
+        digits (int, optional): significant digits kept of each value. Defaults to 6.
+
+    Returns:
+        tuple: the rounded values of the expression, None if the expression cannot be
+            evaluated or is not finite at every sample point
+    """
+    values = {}
+    for symbol in compiled.symbols:
+        key = (str(symbol), n, sample_min, sample_max)
+        if key not in _FINGERPRINT_VALUES:
+            # seeding with a string is stable across processes
+            rng = random.Random("%s:%s" % (FINGERPRINT_SEED, symbol))
+            _FINGERPRINT_VALUES[key] = np.array([rng.uniform(sample_min, sample_max) for _ in range(n)])
+        values[symbol] = _FINGERPRINT_VALUES[key]
+    try:
+        with np.errstate(all='ignore'):
+            result = np.broadcast_to(np.asarray(compiled.evaluate(values)), (n,))
+        if np.iscomplexobj(result) or not np.all(np.isfinite(result)):
+            return None
+        # adding 0.0 turns -0.0 into 0.0
+        return tuple("%.*g" % (digits, value + 0.0) for value in result.astype(float))
+    except Exception:
+        return None
+
 def check_kinetics_derivative(kinetics, ids_list, species_list, is_positive_derivative=True):
     """check if the derivative to ids_list of a kinetics are always strictly positive where variables are positive
 
@@ -89,29 +271,55 @@ def check_kinetics_derivative(kinetics, ids_list, species_list, is_positive_deri
 
     Returns:
         bool: if every symbol's derivative if strictly positive if is_positive_derivative, strictively negative if not is_positive_derivative
+
+    Raises:
+        ValueError: if the kinetics cannot be parsed or evaluated
     """
-    for symbol in ids_list:
-        if symbol not in species_list:
-            kinetics = kinetics.replace(symbol, "1")
-    for species in species_list:
-        curr_kinetics = kinetics
-        for other_species in species_list:
-            if other_species != species:
-                curr_kinetics = curr_kinetics.replace(other_species, "1")
-        if is_positive_derivative:
-            prev = -math.inf
-        else:
-            prev = math.inf
-        for i in range(1, 1001, 10):
-            expr = curr_kinetics.replace(species, str(i/100))
-            curr = eval(expr)
-            if is_positive_derivative:
-                if curr <= prev:
-                    return False
-            else:
-                if curr >= prev:
-                    return False
-            prev = curr
+    symbols = {symbol: sp.Symbol(symbol) for symbol in ids_list}
+    try:
+        expr = sp.sympify(kinetics, locals=symbols)
+    except Exception:
+        raise ValueError("Invalid kinetics: " + kinetics)
+    return check_compiled_derivative(CompiledExpression(expr), species_list, is_positive_derivative)
+
+def check_compiled_derivative(compiled, species_list, is_positive_derivative=True):
+    """check if the derivative of a compiled kinetics to every species is strictly positive,
+    sampling each species from 0.01 to 9.91 while every other symbol is 1
+
+    Args:
+        compiled (CompiledExpression): the compiled kinetics
+        species_list (List): all species in expression
+        is_positive_derivative (bool, optional): if we are checking the derivative is positive, checking negative otherwise. Defaults to True.
+
+    Returns:
+        bool: if every symbol's derivative if strictly positive if is_positive_derivative, strictively negative if not is_positive_derivative
+
+    Raises:
+        ValueError: if the kinetics is not a finite real number at a sample point
+    """
+    if len(species_list) == 0:
+        return True
+    # one row per species, sampled along the row while every other symbol is 1, so that
+    # the whole grid is evaluated at once
+    shape = (len(species_list), len(DERIVATIVE_SAMPLES))
+    values = {}
+    for symbol in compiled.symbols:
+        rows = [str(symbol) == species for species in species_list]
+        values[symbol] = np.where(np.array(rows)[:, None], DERIVATIVE_SAMPLES, 1.0)
+    with np.errstate(all='ignore'):
+        result = np.broadcast_to(np.asarray(compiled.evaluate(values), dtype=complex), shape)
+    invalid = (result.imag != 0) | ~np.isfinite(result.real)
+    steps = np.diff(result.real, axis=1)
+    violations = steps <= 0 if is_positive_derivative else steps >= 0
+    # the species are checked in order, and the samples of a species in increasing order,
+    # stopping at the first invalid value or violation
+    for row, species in enumerate(species_list):
+        first_invalid = np.argmax(invalid[row]) if invalid[row].any() else shape[1]
+        first_violation = np.argmax(violations[row]) + 1 if violations[row].any() else shape[1]
+        if first_invalid < shape[1] and first_invalid <= first_violation:
+            raise ValueError("Kinetics cannot be evaluated where %s is %s" % (species, DERIVATIVE_SAMPLES[first_invalid]))
+        if first_violation < shape[1]:
+            return False
     return True
 
 
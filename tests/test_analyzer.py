@@ -1,6 +1,12 @@
 import unittest
 import sys
 import os
+import gzip
+import tempfile
+import zipfile
+import weakref
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
 # setting path
 current_dir = os.path.dirname(__file__)
 parent_dir = os.path.dirname(current_dir)
@@ -9,6 +15,12 @@ sys.path.append(common_dir)
 
 from analyzer import Analyzer
 from analyzer import check_model
+from analyzer import ALL_CHECKS, CHECKS, CLASSIFICATION, CLASSIFICATION_RELATED_CHECKS
+import analyzer as analyzer_module
+import reaction_data
+from conversion import convert_antimony
+from result_cache import ResultCache
+from sandbox import Sandbox
 
 
 DIR = os.path.dirname(os.path.abspath(__file__))
@@ -17,6 +29,13 @@ TEST_MODELS = "test_models"
 INVALID_PATH = os.path.join(DIR, TEST_MODELS, "invalid.ant")
 REVERSIBLE_MM_PATH = os.path.join(DIR, TEST_MODELS, "reversible_MM.json")
 
+OMEX_MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<omexManifest xmlns="http://identifiers.org/combine.specifications/omex-manifest">
+  <content location="./model.xml" format="http://identifiers.org/combine.specifications/sbml" master="true"/>
+  <content location="./other.xml" format="http://identifiers.org/combine.specifications/sbml"/>
+</omexManifest>
+"""
+
 PATH_1 = os.path.join(DIR, TEST_MODELS, "1.ant")
 TRUE_PATH_1 = os.path.join(DIR, TEST_MODELS, "true_0001.ant")
 FALSE_PATH_1 = os.path.join(DIR, TEST_MODELS, "false_0001.ant")
@@ -140,10 +159,255 @@ class TestAnalyzer(unittest.TestCase):
         except ValueError:
             self.fail("Unexpected ValueError")
     
+    def test_file_formats(self):
+        expected = str(check_model(PATH_1))
+        with open(PATH_1) as file:
+            xml = convert_antimony(file.read())
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ["model.xml", "model.sbml", "model"]:
+                path = os.path.join(directory, name)
+                with open(path, "w") as file:
+                    file.write(xml)
+                # SBML files are not parsed as Antimony
+                with mock.patch.object(reaction_data, "antimony_to_sbml") as antimony_to_sbml:
+                    self.assertEqual(str(check_model(path)), expected)
+                antimony_to_sbml.assert_not_called()
+            # Antimony file without extension
+            path = os.path.join(directory, "antimony_model")
+            with open(PATH_1) as file, open(path, "w") as copy:
+                copy.write(file.read())
+            self.assertEqual(str(check_model(path)), expected)
+            # SBML file without a model
+            path = os.path.join(directory, "empty.xml")
+            with open(path, "w") as file:
+                file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            with self.assertRaises(ValueError) as context:
+                Analyzer(path)
+            self.assertEqual(str(context.exception), "Invalid SBML model.")
+            # archives of one model
+            with open(PATH_1) as file:
+                antimony_str = file.read()
+            with gzip.open(os.path.join(directory, "model.xml.gz"), "wt") as file:
+                file.write(xml)
+            with zipfile.ZipFile(os.path.join(directory, "model.zip"), "w") as archive:
+                archive.writestr("models/1.ant", antimony_str)
+            with zipfile.ZipFile(os.path.join(directory, "model.omex"), "w") as archive:
+                archive.writestr("manifest.xml", OMEX_MANIFEST)
+                archive.writestr("model.xml", xml)
+                archive.writestr("other.xml", xml.replace("Km1", "Km2"))
+            for name in ["model.xml.gz", "model.zip", "model.omex"]:
+                self.assertEqual(str(check_model(os.path.join(directory, name))), expected)
+            with zipfile.ZipFile(os.path.join(directory, "models.zip"), "w") as archive:
+                archive.writestr("model.xml", xml)
+                archive.writestr("1.ant", antimony_str)
+            with self.assertRaises(ValueError):
+                Analyzer(os.path.join(directory, "models.zip"))
+            # model file that does not exist
+            with self.assertRaises(ValueError) as context:
+                Analyzer(os.path.join(directory, "missing.ant"))
+            self.assertEqual(str(context.exception),
+                             "Invalid model_str format, should be SBML or Antimony string, or path to model file.")
+
     def test_check_model(self):
         results = check_model(PATH_1)
         self.assertEqual(str(results), '_J0:\n  Warning 1006: Expecting these parameters to be constants: Km1\n')
         
+    def test_lazy_reaction_data(self):
+        analyzer = Analyzer(PATH_1)
+        analyzer.checks([1, 2, 1005, 1010])
+        for data in analyzer.data.reactions:
+            self.assertNotIn("kinetics_sim", data.__dict__)
+            self.assertNotIn("non_constant_params", data.__dict__)
+        analyzer.checks([1001, 1006])
+        for data in analyzer.data.reactions:
+            self.assertIn("kinetics_sim", data.__dict__)
+            self.assertIn("non_constant_params", data.__dict__)
+        
+    def test_parallel(self):
+        model = """
+            J0: S1 -> S2; k1*S1
+            J1: S2 -> S3; Vm*S2/(Km + S2)
+            J2: S3 + S4 -> S5; k2*S3*S4 - k3*S5
+            J3: S5 -> ; k4*S6
+            J4: -> S1; 5
+            J5: S2 => S4; k5*S2^2/(K^2 + S2^2)
+            J6: S4 -> S6; k6*S4 - k7*S6
+            k1 = 1; k2 = 1; k3 = 1; k4 = 1; k5 = 1; k6 = 1; k7 = 1; Vm = 1; Km = 1; K = 1
+            k1 := S1
+        """
+        serial = Analyzer(model, REVERSIBLE_MM_PATH)
+        serial.check_all()
+        parallel = Analyzer(model, REVERSIBLE_MM_PATH, workers=2)
+        parallel.check_all()
+        self.assertEqual(str(parallel.results), str(serial.results))
+        self.assertEqual(parallel.data.default_classifications, serial.data.default_classifications)
+        self.assertEqual(parallel.data.custom_classifications, serial.data.custom_classifications)
+        parallel.checks([1, 2, 1006])
+        serial.checks([1, 2, 1006])
+        self.assertEqual(str(parallel.results), str(serial.results))
+        # the cached reactions are merged in their order with the checked ones
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(os.path.join(directory, "cache.sqlite"))
+            Analyzer("J1: S2 -> S3; Vm*S2/(Km + S2); Vm = 1; Km = 1", cache=cache).check_all()
+            self.assertEqual(str(check_model(model, cache=cache, workers=3)), str(check_model(model)))
+            self.assertEqual(cache.hits, 1)
+            cache.close()
+        # a worker compiles the classification libraries before the time budget of any reaction
+        reactions = Analyzer(model).data.reactions
+        for data in reactions:
+            data.boundary_species, data.non_constant_params
+        for codes, expected_calls in [(ALL_CHECKS, 1), ([1, 2, 1006], 0)]:
+            with mock.patch.object(Analyzer, "_compile_libraries", autospec=True) as compile_libraries:
+                outcomes = analyzer_module._check_shard(REVERSIBLE_MM_PATH, 10, codes, reactions)
+            self.assertEqual(compile_libraries.call_count, expected_calls)
+            self.assertTrue(all(is_complete for _, is_complete, _ in outcomes))
+        with self.assertRaises(ValueError):
+            Analyzer(model, workers=0)
+        with Sandbox() as sandbox, self.assertRaises(ValueError):
+            Analyzer(model, sandbox=sandbox, workers=2)
+
+    def test_edit_reactions(self):
+        model = """
+            J0: S1 -> S2; k1*S1
+            J1: S2 -> S3; Vm*S2/(Km + S2)
+            J2: S3 + S4 -> S5; k2*S3*S4 - k3*S5
+            J3: S5 -> S6; k4*S5
+            k1 = 1; k2 = 1; k3 = 1; k4 = 1; Vm = 1; Km = 1
+        """
+
+        def assert_checked(analyzer, model):
+            expected = Analyzer(model)
+            expected.checks(analyzer._codes)
+            self.assertEqual(str(analyzer.results), str(expected.results))
+            self.assertEqual(analyzer.results.count_messages(), expected.results.count_messages())
+            self.assertEqual(analyzer.data.default_classifications, expected.data.default_classifications)
+
+        analyzer = Analyzer(model)
+        analyzer.check_all()
+        analyzer.update_reaction("J1", "k4*S6")
+        model = model.replace("Vm*S2/(Km + S2)", "k4*S6")
+        assert_checked(analyzer, model)
+        analyzer.add_reaction("J4", ["S6"], ["S1"], "k1*S6 + S3", is_reversible=True)
+        model += "J4: S6 -> S1; k1*S6 + S3\n"
+        assert_checked(analyzer, model)
+        analyzer.remove_reaction("J2")
+        model = model.replace("J2: S3 + S4 -> S5; k2*S3*S4 - k3*S5", "")
+        assert_checked(analyzer, model)
+        analyzer.checks([1, 2, 1001])
+        analyzer.update_reaction("J0", "")
+        assert_checked(analyzer, model.replace("k1*S1", ""))
+        with self.assertRaises(ValueError):
+            analyzer.update_reaction("J2", "k1")
+        with self.assertRaises(ValueError):
+            analyzer.update_reaction("J1", "k1*")
+        with self.assertRaises(ValueError):
+            analyzer.add_reaction("J1", [], [], "k1")
+
+    def test_diff(self):
+        old_model = """
+            J0: S1 -> S2; k1*S1
+            J1: S2 -> S3; Vm*S2/(Km + S2)
+            J2: S3 + S4 -> S5; k2*S3*S4 - k3*S5
+            J3: S5 -> S6; k4*S6
+            J4: S6 -> ; k5
+            k1 = 1; k2 = 1; k3 = 1; k4 = 1; k5 = 1; Vm = 1; Km = 1
+        """
+        new_model = old_model.replace("k1*S1", "k1").replace("k4*S6", "k4*S5").replace("J4:", "J5:")
+        new_model = new_model.replace("J2: S3 + S4 -> S5; k2*S3*S4 - k3*S5", "") + "J6: S1 -> S7; S7\n"
+        diff = Analyzer.diff(old_model, new_model)
+        self.assertEqual(diff.added_reactions, ["J6"])
+        self.assertEqual(diff.removed_reactions, ["J2"])
+        self.assertEqual(diff.modified_reactions, ["J0", "J3"])
+        # J4 is renamed to J5
+        self.assertEqual(diff.unchanged_reactions, ["J1", "J5"])
+        self.assertEqual(diff.errors, [])
+        old = Analyzer(old_model)
+        old.check_all()
+        new = Analyzer(new_model)
+        new.check_all()
+        for reaction_id in ["J0", "J3", "J6"]:
+            messages = diff.new_messages.get_messages_by_reaction(reaction_id) \
+                + diff.persisting_messages.get_messages_by_reaction(reaction_id)
+            self.assertCountEqual(messages, new.results.get_messages_by_reaction(reaction_id))
+        for reaction_id in ["J0", "J2", "J3"]:
+            messages = diff.resolved_messages.get_messages_by_reaction(reaction_id) \
+                + diff.persisting_messages.get_messages_by_reaction(reaction_id)
+            self.assertCountEqual(messages, old.results.get_messages_by_reaction(reaction_id))
+        self.assertEqual([message["code"] for message in diff.resolved_messages.get_messages_by_reaction("J3")],
+                         [2, 1002, 1003])
+        self.assertEqual(diff.new_messages.count_messages(), 6)
+        # a stoichiometry edit does not change the messages, but the reaction is modified
+        model = "J0: S1 -> S2; k1*S1; k1 = 1; S1 = 1"
+        diff = Analyzer.diff(model, model.replace("S1 ->", "2 S1 ->"))
+        self.assertEqual((diff.modified_reactions, diff.unchanged_reactions), (["J0"], []))
+        self.assertEqual(diff.new_messages.count_messages() + diff.resolved_messages.count_messages(), 0)
+        diff = Analyzer.diff(model, model.replace("J0: S1 ->", "J1: 2 S1 ->"))
+        self.assertEqual((diff.added_reactions, diff.removed_reactions, diff.unchanged_reactions), (["J1"], ["J0"], []))
+        # only the reactions that differ are checked
+        with mock.patch.object(Analyzer, "_check_reactions", autospec=True) as check_reactions:
+            Analyzer.diff(old_model, old_model)
+            self.assertEqual([len(call.args[2]) for call in check_reactions.call_args_list], [0, 0])
+
+    def test_classification_reuse(self):
+        analyzer = Analyzer(TRUE_PATH_1020, REVERSIBLE_MM_PATH)
+        analyzer.checks([1002])
+        expected = str(analyzer.results), analyzer.data.default_classifications, analyzer.data.custom_classifications
+        with mock.patch.object(Analyzer, "_classify") as classify:
+            analyzer.checks([1020, 1021])
+            analyzer.checks([1002])
+            classify.assert_not_called()
+        self.assertEqual((str(analyzer.results), analyzer.data.default_classifications, analyzer.data.custom_classifications),
+                         expected)
+        # an edited reaction is classified again, the others are not
+        reaction_id = analyzer.data.reactions[0].reaction_id
+        with mock.patch.object(Analyzer, "_classify", wraps=analyzer._classify) as classify:
+            analyzer.update_reaction(reaction_id, "k1")
+            analyzer.checks([1002])
+            self.assertEqual(classify.call_count, 2)
+        # a changed classification library invalidates every classification
+        analyzer.data.custom_classifier = None
+        analyzer.data.custom_classifications = {}
+        with mock.patch.object(Analyzer, "_classify", wraps=analyzer._classify) as classify:
+            analyzer.checks([1002])
+            self.assertEqual(classify.call_count, len(analyzer.data.reactions))
+        self.assertEqual(analyzer.data.custom_classifications, {})
+
+    def test_check_registry(self):
+        self.assertEqual(sorted(code for check in CHECKS for code in check.codes), sorted(set(ALL_CHECKS) - {1007}))
+        self.assertEqual(sorted(code for check in CHECKS if CLASSIFICATION in check.artifacts for code in check.codes),
+                         CLASSIFICATION_RELATED_CHECKS)
+        analyzer = Analyzer(PATH_1)
+        analyzer.checks([1, 1010])
+        self.assertEqual(analyzer.data.default_classifications, {})
+        for data in analyzer.data.reactions:
+            self.assertNotIn("expression", data.__dict__)
+            self.assertNotIn("boundary_species", data.__dict__)
+        analyzer.checks([1021])
+        self.assertEqual(len(analyzer.data.default_classifications), len(analyzer.data.reactions))
+        for data in analyzer.data.reactions:
+            self.assertIn("numerator_denominator", data.__dict__)
+            self.assertNotIn("non_constant_params", data.__dict__)
+
+    def test_release(self):
+        analyzer = Analyzer(PATH_1)
+        analyzer.check_all()
+        results = analyzer.results
+        reference = weakref.ref(analyzer.data)
+        del analyzer
+        # freed without waiting for a garbage collection
+        self.assertIsNone(reference())
+        self.assertTrue(str(results))
+
+    def test_reactions_outlive_analyzer(self):
+        reactions = Analyzer(PATH_1).data.reactions
+        # the fields computed on first access do not need the analyzer
+        expected = Analyzer(PATH_1).data.reactions
+        for data, expected_data in zip(reactions, expected):
+            self.assertEqual(data.kinetics_sim, expected_data.kinetics_sim)
+            self.assertEqual(data.boundary_species, expected_data.boundary_species)
+            self.assertEqual(data.non_constant_params, expected_data.non_constant_params)
+            self.assertEqual(data.fingerprint(), expected_data.fingerprint())
+
     def test_list_all_checks(self):
         checks = Analyzer.list_all_checks()
         self.assertTrue(isinstance(checks, str))
@@ -222,6 +486,18 @@ class TestAnalyzer(unittest.TestCase):
         self.assertEqual(str(true_case_analyzer.results), 'No errors or warnings found.')
         self.assertEqual(str(false_case_analyzer.results), '_J0:\n  Warning 1006: Expecting these parameters to be constants: k1\n')
     
+    def test_check_1007(self):
+        true_case_analyzer = Analyzer(TRUE_PATH_1006)
+        false_case_analyzer = Analyzer(TRUE_PATH_1006)
+        # a budget that every reaction exceeds
+        false_case_analyzer.data.time_budget = 1e-9
+        true_case_analyzer.checks([1002, 1003, 1007])
+        false_case_analyzer.checks([1002, 1003, 1007])
+        self.assertEqual(str(true_case_analyzer.results), 'No errors or warnings found.')
+        self.assertEqual(str(false_case_analyzer.results), '_J0:\n  Warning 1007: Rate law is too complex to process within the time or memory limit, other checks are skipped.\n')
+        self.assertEqual(false_case_analyzer.data.default_classifications, {})
+        self.assertIsNone(Analyzer(TRUE_PATH_1006, abort_on_complicated_rate_laws=False).data.time_budget)
+    
     def test_check_1010(self):
         true_case_analyzer = Analyzer(TRUE_PATH_1010)
         false_case_analyzer = Analyzer(FALSE_PATH_1010)
@@ -366,6 +642,17 @@ class TestAnalyzer(unittest.TestCase):
         analyzer.checks([1001, 1002, 1003, 1004, 1005, 1006, 1010, 1020, 1021, 1022, 1030, 1031, 1032, 1033, 1034, 1035, 1036, 1037, 1040, 1041, 1042, 1043, 1044])
         self.assertEqual(str(except_analyzer.results), str(analyzer.results))
     
+    def test_thread_pool(self):
+        paths = [PATH_1, TRUE_PATH_1002, FALSE_PATH_1002, TRUE_PATH_1003, FALSE_PATH_1003, FALSE_PATH_1004,
+                 TRUE_PATH_1005, FALSE_PATH_1006, FALSE_PATH_1010, "S1 -> S2; k1*S1", "S -> P; Vm*S/(Km + S)"] * 2
+        def analyze(path):
+            analyzer = Analyzer(path, REVERSIBLE_MM_PATH)
+            analyzer.check_all()
+            return str(analyzer.results)
+        expected = [analyze(path) for path in paths]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(list(executor.map(analyze, paths)), expected)
+
     def test_check_all(self):
         all_analyzer = Analyzer(PATH_1)
         analyzer = Analyzer(PATH_1)
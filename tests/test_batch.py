@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+import gzip
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+# setting path
+current_dir = os.path.dirname(__file__)
+parent_dir = os.path.dirname(current_dir)
+common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
+sys.path.append(common_dir)
+
+import batch
+from analyzer import check_model
+from batch import BatchAnalyzer, check_models, iter_check_models
+from conversion import convert_antimony
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_MODELS = "test_models"
+
+PATH_1 = os.path.join(DIR, TEST_MODELS, "1.ant")
+FALSE_PATH_1002 = os.path.join(DIR, TEST_MODELS, "false_1002.ant")
+TRUE_PATH_1003 = os.path.join(DIR, TEST_MODELS, "true_1003.ant")
+FALSE_PATH_1010 = os.path.join(DIR, TEST_MODELS, "false_1010.ant")
+INVALID_MODEL = "S1 -> ; k1*"
+# models that terminate the worker process checking them
+CRASHING_MODELS = ["S1 -> S2; k1*S1 // crash", "S3 -> S4; k3*S3 // crash"]
+
+MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<omexManifest xmlns="http://identifiers.org/combine.specifications/omex-manifest">
+  <content location="./model0.xml" format="http://identifiers.org/combine.specifications/sbml" master="true"/>
+  <content location="./model1.xml" format="http://identifiers.org/combine.specifications/sbml"/>
+  <content location="./simulation.sedml" format="http://identifiers.org/combine.specifications/sed-ml"/>
+</omexManifest>
+"""
+
+_check_model = batch._check_model
+
+
+def _crashing_check_model(task):
+    if task[0] in CRASHING_MODELS:
+        os._exit(1)
+    return _check_model(task)
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_check_models(self):
+        models = [PATH_1, INVALID_MODEL, FALSE_PATH_1002, TRUE_PATH_1003, FALSE_PATH_1010, "S1 -> S2; k1*S1"]
+        batch = BatchAnalyzer(workers=2, chunksize=2)
+        results = batch.check_models(models, excluded_codes=[1006])
+        self.assertEqual(list(results.keys()), models)
+        self.assertIsNone(results[INVALID_MODEL])
+        self.assertEqual(list(batch.errors.keys()), [INVALID_MODEL])
+        for model in models:
+            if model != INVALID_MODEL:
+                self.assertEqual(str(results[model]), str(check_model(model, excluded_codes=[1006])))
+
+    def test_serial(self):
+        models = [FALSE_PATH_1002, "S1 -> S2; k1*S1"]
+        self.assertEqual({model: str(results) for model, results in check_models(models, workers=1).items()},
+                         {model: str(check_model(model)) for model in models})
+
+    def test_iter_check_models(self):
+        # in the order of their names
+        models = [FALSE_PATH_1002, FALSE_PATH_1010, TRUE_PATH_1003]
+        expected = [str(check_model(model)) for model in models]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            model_dir = os.path.join(temp_dir, "models")
+            os.mkdir(model_dir)
+            archive_path = os.path.join(temp_dir, "models.zip")
+            with zipfile.ZipFile(archive_path, "w") as archive:
+                for model in models:
+                    shutil.copy(model, model_dir)
+                    archive.write(model, os.path.basename(model))
+            paths = [os.path.join(model_dir, os.path.basename(model)) for model in models]
+            for source, model_ids in [(model_dir, paths), (os.path.join(model_dir, "*.ant"), paths),
+                                      (archive_path, [os.path.join(archive_path, os.path.basename(model)) for model in models]),
+                                      (iter(models), models)]:
+                results = list(iter_check_models(source))
+                self.assertEqual([model_id for model_id, _ in results], model_ids)
+                self.assertEqual([str(model_results) for _, model_results in results], expected)
+            results = list(iter_check_models(model_dir, workers=2))
+            self.assertEqual([str(model_results) for _, model_results in results], expected)
+            with self.assertRaises(ValueError):
+                list(iter_check_models(os.path.join(temp_dir, "*.xml")))
+
+    def test_archives(self):
+        models = [FALSE_PATH_1002, FALSE_PATH_1010, TRUE_PATH_1003]
+        expected = [str(check_model(model)) for model in models]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            omex_path = os.path.join(temp_dir, "models.omex")
+            with zipfile.ZipFile(omex_path, "w") as archive:
+                archive.writestr("manifest.xml", MANIFEST)
+                for index, model in enumerate(models[:2]):
+                    with open(model) as file:
+                        archive.writestr("model%d.xml" % index, convert_antimony(file.read()))
+                archive.writestr("simulation.sedml", "<sedML/>")
+            gzip_path = os.path.join(temp_dir, "model.ant.gz")
+            with open(models[2], "rb") as file, gzip.open(gzip_path, "wb") as compressed:
+                compressed.write(file.read())
+            # every SBML entry of the COMBINE archive is checked
+            results = list(iter_check_models([omex_path, gzip_path]))
+            self.assertEqual([model_id for model_id, _ in results],
+                             [os.path.join(omex_path, "model0.xml"), os.path.join(omex_path, "model1.xml"), gzip_path])
+            self.assertEqual([str(model_results) for _, model_results in results], expected)
+            results = check_models(temp_dir, workers=2)
+            self.assertEqual([str(model_results) for model_results in results.values()], expected[2:] + expected[:2])
+
+    def test_broken_worker(self):
+        models = [PATH_1, FALSE_PATH_1002, CRASHING_MODELS[0], TRUE_PATH_1003, FALSE_PATH_1010,
+                  "S1 -> S2; k1*S1", CRASHING_MODELS[1], INVALID_MODEL]
+        expected = {model: str(check_model(model)) for model in models if model not in CRASHING_MODELS + [INVALID_MODEL]}
+        # the workers are forked with the patched module
+        with mock.patch.object(batch, "_check_model", _crashing_check_model):
+            for chunksize in [1, 2]:
+                analyzer = BatchAnalyzer(workers=2, chunksize=chunksize)
+                results = analyzer.check_models(models)
+                self.assertEqual(list(results.keys()), models)
+                # only the models that terminated their worker fail, their neighbours are checked again
+                self.assertEqual(list(analyzer.errors.keys()), [CRASHING_MODELS[0], CRASHING_MODELS[1], INVALID_MODEL])
+                self.assertEqual([analyzer.errors[model] for model in CRASHING_MODELS], [batch._BROKEN_WORKER_MESSAGE] * 2)
+                self.assertEqual({model: str(results[model]) for model in expected}, expected)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            BatchAnalyzer(workers=0)
+        with self.assertRaises(ValueError):
+            BatchAnalyzer(chunksize=0)
+
+if __name__ == "__main__":
+    unittest.main()
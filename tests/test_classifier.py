@@ -1,6 +1,8 @@
 import unittest
 import os
+import shutil
 import sys
+import tempfile
  
 # setting path
 current_dir = os.path.dirname(__file__)
@@ -10,7 +12,8 @@ sys.path.append(common_dir)
 
 # from ratesb_python.common.custom_classifier import _CustomClassifier
 from analyzer import Analyzer
-from custom_classifier import _CustomClassifier
+from custom_classifier import _CustomClassifier, CLASSIFICATION_MEMO
+from unittest import mock
 
 DIR = os.path.dirname(os.path.realpath(__file__))
 UPPER_DIR = os.path.dirname(DIR)
@@ -57,6 +60,85 @@ class TestClassifier(unittest.TestCase):
         self.assertEqual(classifier.warning_message, 
                         """Some items in your JSON file were invalid and have been removed.\nDetails:\nRate law incomplete does not follow the correct structure.\nItem at index 1 does not follow the correct structure.\nRate law invalid expression has an invalid expression.\nRate law invalid optional symbols (not a list) does not follow the correct structure.\noptional_symbols in rate law invalid optional symbols (not a list of strings) should be a list of strings.\nInvalid item in optional_symbols in rate law invalid optional symbols (invalid names), should only contain compartment, parameter, reactant1, reactant2, reactant3, product1, product2, product3, enzyme.\nRate law invalid power limited species (not a list) does not follow the correct structure.\npower_limited_species in rate law invalid power limited species (not a list of strings) should be a list of strings.\nInvalid item in power_limited_species in rate law invalid power limited species (invalid names), should only contain reactant1, reactant2, reactant3, product1, product2, product3, enzyme.""")
         
+    def test_library_shared_and_invalidated(self):
+        classifier = _CustomClassifier(DEFAULT_CLASSIFIER_PATH)
+        other_classifier = _CustomClassifier(DEFAULT_CLASSIFIER_PATH)
+        self.assertIs(classifier.library, other_classifier.library)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "classifier.json")
+            shutil.copyfile(DEFAULT_CLASSIFIER_PATH, path)
+            library = _CustomClassifier(path).library
+            self.assertIs(_CustomClassifier(path).library, library)
+            with open(path, 'w') as file:
+                file.write('[{"name": "MA", "expression": "parameter * reactant1", "optional_symbols": [], "power_limited_species": []}]')
+            changed_library = _CustomClassifier(path).library
+            self.assertIsNot(changed_library, library)
+            self.assertEqual([rate_law.name for rate_law in changed_library.rate_laws], ["MA"])
+
+    def test_fingerprint_index(self):
+        library = _CustomClassifier(DEFAULT_CLASSIFIER_PATH).library
+        index = library.fingerprint_index
+        self.assertEqual(index.unindexed, [])
+        self.assertEqual(sorted(i for indices in index.keep_groups.values() for i in indices), list(range(len(library.rate_laws))))
+        self.assertEqual(sum(len(entries) for entries in index.entries.values()), sum(len(rate_law.variants) for rate_law in library.rate_laws))
+
+    def test_families(self):
+        classifier = _CustomClassifier(DEFAULT_CLASSIFIER_PATH)
+        library = classifier.library
+        index = library.fingerprint_index
+        names = [rate_law.name for rate_law in library.rate_laws]
+        self.assertEqual([names[i] for i in index.families[(1, 0, frozenset(["parameter"]), True)]], [UNDR1])
+        self.assertIn(names.index(MM), index.families[(1, 0, frozenset(["parameter"]), False)])
+        def classify(kinetics, reactants, products, enzymes, parameters):
+            return classifier.custom_classify(is_default=True, reactant_list=reactants, product_list=products, kinetics=kinetics,
+                                              species_in_kinetic_law=reactants + products + enzymes,
+                                              parameters_in_kinetic_law_only=parameters, compartment_in_kinetic_law=[])
+        CLASSIFICATION_MEMO.clear()
+        # only the power limited species of the rate laws the kinetics might match are canonicalized
+        with mock.patch.object(_CustomClassifier, "_canonical_kinetics", autospec=True,
+                               side_effect=_CustomClassifier._canonical_kinetics) as canonical_kinetics:
+            self.assertTrue(classify("k*S", ["S"], [], [], ["k"])[UNDR1])
+            self.assertEqual(sorted(call.args[4] for call in canonical_kinetics.call_args_list), [[], ["enzyme"]])
+            canonical_kinetics.reset_mock()
+            self.assertTrue(classify("Vm*S/(Km + S)", ["S"], [], [], ["Vm", "Km"])[MM])
+            self.assertEqual(sorted(call.args[4] for call in canonical_kinetics.call_args_list), [[], ["enzyme"], ["reactant1"]])
+        # kinetics that only reduce to a rate law once simplified
+        self.assertTrue(classify("(k*A*B + k*A)/(B + 1)", ["A", "B"], [], [], ["k"])[UNDR1])
+        self.assertTrue(classify("(k*A*E + k*A)/(E + 1)", ["A"], [], ["E"], ["k"])[UNDR1])
+        self.assertTrue(classify("k*A*(B + 1)/(B + 1)", ["A", "B"], [], [], ["k"])[UNDR1])
+
+    def test_reactant_order(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "classifier.json")
+            with open(path, 'w') as file:
+                file.write('[{"name": "SUB", "expression": "parameter * reactant1 / (parameter + reactant2)", "optional_symbols": [], "power_limited_species": []},'
+                           ' {"name": "SQ", "expression": "parameter * reactant1^2 * reactant2", "optional_symbols": [], "power_limited_species": ["reactant1"]}]')
+            classifier = _CustomClassifier(path)
+            def classify(kinetics, reactants):
+                return classifier.custom_classify(reactant_list=reactants, product_list=[], kinetics=kinetics,
+                                                  species_in_kinetic_law=reactants, parameters_in_kinetic_law_only=["k", "K"],
+                                                  compartment_in_kinetic_law=[])
+            self.assertEqual(classify("k*A/(K+B)", ["A", "B"]), {"SUB": True, "SQ": False})
+            self.assertEqual(classify("k*B/(K+A)", ["A", "B"]), {"SUB": True, "SQ": False})
+            self.assertEqual(classify("k*A*B^2", ["A", "B"]), {"SUB": False, "SQ": True})
+            self.assertEqual(classify("k*A*B^3", ["A", "B"]), {"SUB": False, "SQ": False})
+
+    def test_classification_memo(self):
+        classifier = _CustomClassifier(DEFAULT_CLASSIFIER_PATH)
+        def classify(kinetics, reactants, parameters):
+            return classifier.custom_classify(is_default=True, reactant_list=reactants, product_list=[], kinetics=kinetics,
+                                              species_in_kinetic_law=reactants, parameters_in_kinetic_law_only=parameters,
+                                              compartment_in_kinetic_law=[])
+        CLASSIFICATION_MEMO.clear()
+        expected = classify("Vm*S/(Km + S)", ["S"], ["Vm", "Km"])
+        self.assertEqual((CLASSIFICATION_MEMO.hits, CLASSIFICATION_MEMO.misses), (0, 1))
+        # the same shape with other ids
+        self.assertEqual(classify("V1*A/(K1 + A)", ["A"], ["V1", "K1"]), expected)
+        self.assertEqual((CLASSIFICATION_MEMO.hits, CLASSIFICATION_MEMO.misses), (1, 1))
+        self.assertNotEqual(classify("k1*A", ["A"], ["k1"]), expected)
+        self.assertEqual((CLASSIFICATION_MEMO.hits, CLASSIFICATION_MEMO.misses), (1, 2))
+        self.assertTrue(expected[MM])
+
     def test_false(self):
         analyzer = Analyzer(os.path.join(DIR, TEST_CLASSIFIER_MODELS, "false.ant"))
         analyzer.checks([1002])
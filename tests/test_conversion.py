@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+# setting path
+current_dir = os.path.dirname(__file__)
+parent_dir = os.path.dirname(current_dir)
+common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
+sys.path.append(common_dir)
+
+import conversion
+from conversion import CONVERSION_MEMO, AntimonyConverter, antimony_to_sbml, convert_antimony
+from analyzer import check_model
+from batch import iter_check_models
+from result_cache import ResultCache
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_MODELS = "test_models"
+
+PATH_1 = os.path.join(DIR, TEST_MODELS, "1.ant")
+FALSE_PATH_1002 = os.path.join(DIR, TEST_MODELS, "false_1002.ant")
+TRUE_PATH_1003 = os.path.join(DIR, TEST_MODELS, "true_1003.ant")
+TRUE_PATH_1040 = os.path.join(DIR, TEST_MODELS, "true_1040.xml")
+MODEL = "S1 -> S2; k1*S1"
+INVALID_MODEL = "S1 -> ; k1*"
+
+
+class TestConversion(unittest.TestCase):
+
+    def setUp(self):
+        CONVERSION_MEMO.clear()
+        self.addCleanup(CONVERSION_MEMO.clear)
+
+    def test_memo(self):
+        xml = antimony_to_sbml(MODEL)
+        self.assertIn("<sbml", xml)
+        self.assertEqual(antimony_to_sbml(MODEL), xml)
+        self.assertEqual((CONVERSION_MEMO.hits, CONVERSION_MEMO.misses), (1, 1))
+        # invalid models are memoized too, and do not leak into the next conversion
+        self.assertIsNone(antimony_to_sbml(INVALID_MODEL))
+        self.assertIsNone(antimony_to_sbml(INVALID_MODEL))
+        self.assertEqual(CONVERSION_MEMO.hits, 2)
+        self.assertEqual(antimony_to_sbml("S2 -> S3; k2*S2"), convert_antimony("S2 -> S3; k2*S2"))
+
+    def test_persistent_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with ResultCache(os.path.join(temp_dir, "cache.sqlite")) as cache:
+                xml = antimony_to_sbml(MODEL, cache)
+                self.assertIsNone(antimony_to_sbml(INVALID_MODEL, cache))
+                self.assertEqual(len(cache), 2)
+            CONVERSION_MEMO.clear()
+            with ResultCache(os.path.join(temp_dir, "cache.sqlite")) as cache, \
+                    mock.patch.object(conversion, "convert_antimony") as convert:
+                self.assertEqual(antimony_to_sbml(MODEL, cache), xml)
+                self.assertIsNone(antimony_to_sbml(INVALID_MODEL, cache))
+                convert.assert_not_called()
+
+    def test_converter(self):
+        models = [MODEL, INVALID_MODEL, "S2 -> S3; k2*S2", "S3 -> S4; k3*S3"]
+        expected = [convert_antimony(model) for model in models]
+        CONVERSION_MEMO.clear()
+        with AntimonyConverter(workers=2) as converter:
+            futures = [converter.submit(model) for model in models]
+            # a conversion in flight or done is not started again
+            self.assertIs(converter.submit(MODEL), futures[0])
+            self.assertEqual([future.result() for future in futures], expected)
+            self.assertEqual(converter.convert(MODEL), expected[0])
+            self.assertEqual(str(check_model(PATH_1, converter=converter)), str(check_model(PATH_1)))
+        with self.assertRaises(ValueError):
+            AntimonyConverter(workers=0)
+
+    def test_batch(self):
+        models = [PATH_1, FALSE_PATH_1002, INVALID_MODEL, TRUE_PATH_1040, MODEL, TRUE_PATH_1003]
+        expected = list(iter_check_models(models))
+        CONVERSION_MEMO.clear()
+        with AntimonyConverter(workers=2) as converter:
+            for workers in [1, 2]:
+                results = list(iter_check_models(models, workers=workers, converter=converter))
+                self.assertEqual([model_id for model_id, _ in results], models)
+                self.assertEqual([str(model_results) for _, model_results in results],
+                                 [str(model_results) for _, model_results in expected])
+
+
+if __name__ == "__main__":
+    unittest.main()
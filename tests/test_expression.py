@@ -0,0 +1,39 @@
+import unittest
+import sys
+import os
+import sympy as sp
+# setting path
+current_dir = os.path.dirname(__file__)
+parent_dir = os.path.dirname(current_dir)
+common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
+sys.path.append(common_dir)
+
+from expression import RateLawExpression
+
+class TestExpression(unittest.TestCase):
+
+    def test_expr(self):
+        # ids that are also sympy names are parsed as plain symbols
+        expression = RateLawExpression("k1*S*E/(Km + S)", ["k1", "S", "E", "Km"])
+        self.assertEqual(expression.free_symbols, {"k1", "S", "E", "Km"})
+        self.assertIs(expression.expr, expression.expr)
+        invalid_expression = RateLawExpression("k1*(", ["k1"])
+        self.assertIsNone(invalid_expression.expr)
+        self.assertEqual(invalid_expression.free_symbols, set())
+        self.assertIsNone(invalid_expression.numerator_denominator)
+        self.assertIsNone(invalid_expression.compiled)
+
+    def test_numerator_denominator(self):
+        # "a" is part of "Vmax", the ids are not replaced inside each other
+        expression = RateLawExpression("Vmax*a/(a + v)", ["Vmax", "a", "v"])
+        numerator, denominator = expression.numerator_denominator
+        self.assertEqual({str(symbol) for symbol in numerator.free_symbols}, {"Vmax", "a"})
+        self.assertEqual({str(symbol) for symbol in denominator.free_symbols}, {"a", "v"})
+
+    def test_compiled(self):
+        expression = RateLawExpression("k1*a/(K + a)", ["k1", "a", "K"])
+        a, k1, K = sp.symbols("a k1 K")
+        self.assertAlmostEqual(expression.compiled.evaluate({a: 2, k1: 3, K: 1}), 2)
+
+if __name__ == "__main__":
+    unittest.main()
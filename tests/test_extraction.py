@@ -0,0 +1,81 @@
+import unittest
+import glob
+import sys
+import os
+# setting path
+current_dir = os.path.dirname(__file__)
+parent_dir = os.path.dirname(current_dir)
+common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
+sys.path.append(common_dir)
+
+from analyzer import Analyzer
+from extraction import extract_reactions, expand_function_calls, SIMPLESBML, LIBSBML
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+UPPER_DIR = os.path.dirname(DIR)
+MODEL_PATHS = sorted(
+    glob.glob(os.path.join(DIR, "test_models", "*.ant")) + glob.glob(os.path.join(DIR, "test_models", "*.xml"))
+    + glob.glob(os.path.join(DIR, "test_classifier_models", "*.ant"))
+    + glob.glob(os.path.join(UPPER_DIR, "benchmark", "models", "*.xml")))
+FUNCTION_MODEL = """
+function MM(Vm, Km, S)
+    Vm*S/(Km + S)
+end
+function scaled(k, x)
+    2*MM(k, k, x)
+end
+J0: S1 -> S2; MM(Vm, Km, S1)
+J1: S2 -> S3; scaled(k1, S2)
+J2: S3 -> ; k1*S3 + k2*S3^2 + k3*S3^3 + k4*S3^4 + k5*S3^5 + k6*S3^6 + k7*S3^7 + k8*S3^8
+J3: -> S1; k0
+Vm = 1; Km = 1; k0 = 1; k1 = 1; k2 = 1; k3 = 1; k4 = 1; k5 = 1; k6 = 1; k7 = 1; k8 = 1
+"""
+
+class TestExtraction(unittest.TestCase):
+
+    def assert_parity(self, model_str):
+        model = Analyzer(model_str).data.model
+        self.assertEqual(extract_reactions(model, LIBSBML), extract_reactions(model, SIMPLESBML))
+
+    def test_parity(self):
+        num_models = 0
+        for path in MODEL_PATHS:
+            try:
+                Analyzer(path)
+            except ValueError:
+                continue
+            with self.subTest(path=os.path.basename(path)):
+                self.assert_parity(path)
+            num_models += 1
+        self.assertGreater(num_models, 50)
+
+    def test_function_definitions(self):
+        self.assert_parity(FUNCTION_MODEL)
+        model = Analyzer(FUNCTION_MODEL).data.model
+        reactions = extract_reactions(model, LIBSBML)
+        self.assertEqual(reactions[0].kinetics, "Vm * S1 / (Km + S1)")
+        self.assertNotIn("MM", reactions[1].kinetics)
+
+    def test_analyzer_parity(self):
+        for path in MODEL_PATHS[:20] + [FUNCTION_MODEL]:
+            try:
+                simplesbml_analyzer = Analyzer(path)
+            except ValueError:
+                continue
+            libsbml_analyzer = Analyzer(path, extraction_backend=LIBSBML)
+            self.assertEqual(simplesbml_analyzer.data.reactions, libsbml_analyzer.data.reactions)
+            simplesbml_analyzer.check_all()
+            libsbml_analyzer.check_all()
+            self.assertEqual(str(simplesbml_analyzer.results), str(libsbml_analyzer.results))
+
+    def test_expand_function_calls(self):
+        function_definitions = [("f", ["x", "y"], "x * y")]
+        self.assertEqual(expand_function_calls("f(a, b) + 1", function_definitions), "a * b + 1")
+        self.assertEqual(expand_function_calls("g(a)", function_definitions), "g(a)")
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            Analyzer("S1 -> S2; k1*S1", extraction_backend="invalid")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+UPPER_DIR = os.path.dirname(DIR)
+
+HEAVY_MODULES = ["sympy", "numpy", "libsbml", "antimony", "SBMLKinetics", "pandas", "matplotlib"]
+# import time budgets in seconds, well above the measured times to leave room for slow machines
+IMPORT_BUDGET = 0.5
+CHECK_MODEL_IMPORT_BUDGET = 1.5
+
+SCRIPT = """
+import json, sys, time
+sys.path.insert(0, %r)
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+def measure_import(statement):
+    output = subprocess.run([sys.executable, "-c", SCRIPT % (UPPER_DIR, statement, HEAVY_MODULES)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+class TestImport(unittest.TestCase):
+
+    def test_import_budget(self):
+        measurement = measure_import("import ratesb_python")
+        self.assertEqual(measurement["loaded"], [])
+        self.assertLess(measurement["elapsed"], IMPORT_BUDGET)
+
+    def test_check_model_import_budget(self):
+        measurement = measure_import("from ratesb_python import check_model, check_models, Analyzer")
+        self.assertEqual(measurement["loaded"], [])
+        self.assertLess(measurement["elapsed"], CHECK_MODEL_IMPORT_BUDGET)
+
+    def test_first_use(self):
+        measurement = measure_import("from ratesb_python import check_model; check_model('S1 -> S2; k1*S1')")
+        self.assertIn("sympy", measurement["loaded"])
+        self.assertIn("libsbml", measurement["loaded"])
+
+if __name__ == "__main__":
+    unittest.main()
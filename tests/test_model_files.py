@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+import gzip
+import tempfile
+import zipfile
+# setting path
+current_dir = os.path.dirname(__file__)
+parent_dir = os.path.dirname(current_dir)
+common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
+sys.path.append(common_dir)
+
+from model_files import is_archive, is_sbml_file, iter_archive_models, read_archive_model
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_MODELS = "test_models"
+
+PATH_1 = os.path.join(DIR, TEST_MODELS, "1.ant")
+TRUE_PATH_1040 = os.path.join(DIR, TEST_MODELS, "true_1040.xml")
+FALSE_PATH_1040 = os.path.join(DIR, TEST_MODELS, "false_1040.xml")
+
+MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<omexManifest xmlns="http://identifiers.org/combine.specifications/omex-manifest">
+  <content location="." format="http://identifiers.org/combine.specifications/omex"/>
+  <content location="./manifest.xml" format="http://identifiers.org/combine.specifications/omex-manifest"/>
+  <content location="./true.xml" format="http://identifiers.org/combine.specifications/sbml.level-3.version-1"/>
+  <content location="./false.xml" format="http://identifiers.org/combine.specifications/sbml" master="true"/>
+  <content location="./simulation.sedml" format="http://identifiers.org/combine.specifications/sed-ml"/>
+</omexManifest>
+"""
+
+
+def read(path):
+    with open(path) as file:
+        return file.read()
+
+
+class TestModelFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir.name, name)
+
+    def test_is_sbml_file(self):
+        self.assertTrue(is_sbml_file(TRUE_PATH_1040))
+        self.assertFalse(is_sbml_file(PATH_1))
+        with open(self.path("model"), "w") as file:
+            file.write("\ufeff\n" + read(TRUE_PATH_1040))
+        self.assertTrue(is_sbml_file(self.path("model")))
+
+    def test_gzip(self):
+        with gzip.open(self.path("model.xml.gz"), "wt") as file:
+            file.write(read(TRUE_PATH_1040))
+        self.assertTrue(is_archive(self.path("model.xml.gz")))
+        self.assertFalse(is_archive(TRUE_PATH_1040))
+        self.assertEqual(list(iter_archive_models(self.path("model.xml.gz"))), [("model.xml", read(TRUE_PATH_1040))])
+        self.assertEqual(read_archive_model(self.path("model.xml.gz")), read(TRUE_PATH_1040))
+
+    def test_zip(self):
+        with zipfile.ZipFile(self.path("models.zip"), "w") as archive:
+            archive.write(TRUE_PATH_1040, "models/true.xml")
+            archive.write(PATH_1, "models/1.ant")
+            archive.writestr("models/sbml", read(FALSE_PATH_1040))
+            archive.writestr("README", "Two models.")
+            archive.writestr("__MACOSX/models/._true.xml", "")
+        self.assertTrue(is_archive(self.path("models.zip")))
+        models = list(iter_archive_models(self.path("models.zip")))
+        self.assertEqual(models, [("models/true.xml", read(TRUE_PATH_1040)), ("models/1.ant", read(PATH_1)),
+                                  ("models/sbml", read(FALSE_PATH_1040))])
+        with self.assertRaises(ValueError):
+            read_archive_model(self.path("models.zip"))
+        with zipfile.ZipFile(self.path("model.zip"), "w") as archive:
+            archive.write(TRUE_PATH_1040, "true.xml")
+            archive.writestr("README", "One model.")
+        self.assertEqual(read_archive_model(self.path("model.zip")), read(TRUE_PATH_1040))
+
+    def test_omex(self):
+        with zipfile.ZipFile(self.path("models.omex"), "w") as archive:
+            archive.writestr("manifest.xml", MANIFEST)
+            archive.write(TRUE_PATH_1040, "true.xml")
+            archive.write(FALSE_PATH_1040, "false.xml")
+            archive.writestr("simulation.sedml", "<sedML/>")
+        self.assertEqual([name for name, _ in iter_archive_models(self.path("models.omex"))], ["true.xml", "false.xml"])
+        self.assertEqual(read_archive_model(self.path("models.omex")), read(FALSE_PATH_1040))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import pickle
+import tempfile
+# setting path
+current_dir = os.path.dirname(__file__)
+parent_dir = os.path.dirname(current_dir)
+common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
+sys.path.append(common_dir)
+
+from analyzer import Analyzer
+from result_cache import ResultCache
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_MODELS = "test_models"
+
+PATH_1 = os.path.join(DIR, TEST_MODELS, "1.ant")
+REVERSIBLE_MM_PATH = os.path.join(DIR, TEST_MODELS, "reversible_MM.json")
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_warm_run(self):
+        expected = Analyzer(PATH_1, REVERSIBLE_MM_PATH)
+        expected.check_all()
+        with ResultCache(self.path) as cache:
+            cold = Analyzer(PATH_1, REVERSIBLE_MM_PATH, cache=cache)
+            cold.check_all()
+            num_reactions = len(cold.data.reactions)
+            self.assertEqual((cache.hits, cache.misses), (0, num_reactions))
+        with ResultCache(self.path) as cache:
+            warm = Analyzer(PATH_1, REVERSIBLE_MM_PATH, cache=cache)
+            warm.check_all()
+            self.assertEqual((cache.hits, cache.misses), (num_reactions, 0))
+        self.assertEqual(str(cold.results), str(expected.results))
+        self.assertEqual(str(warm.results), str(expected.results))
+        self.assertEqual(warm.data.default_classifications, expected.data.default_classifications)
+        self.assertEqual(warm.data.custom_classifications, expected.data.custom_classifications)
+        # the kinetic laws are not parsed on a warm run
+        for data in warm.data.reactions:
+            self.assertNotIn("expression", data.__dict__)
+
+    def test_key(self):
+        cache = ResultCache(self.path)
+        analyzer = Analyzer("S1 -> S2; k1*S1; S3 -> S4; k1*S3; S5 -> S6; k2*S5")
+        first, second, third = analyzer.data.reactions
+        self.assertNotEqual(cache.key(first, [1001], ["digest"]), cache.key(second, [1001], ["digest"]))
+        self.assertNotEqual(cache.key(first, [1001], ["digest"]), cache.key(first, [1002], ["digest"]))
+        self.assertNotEqual(cache.key(first, [1001], ["digest"]), cache.key(first, [1001], ["other digest"]))
+        # the reaction id is not part of the key
+        other = Analyzer("S1 -> S2; k1*S1")
+        self.assertEqual(cache.key(first, [1001], ["digest"]), cache.key(other.data.reactions[0], [1001], ["digest"]))
+
+    def test_eviction(self):
+        with ResultCache(self.path, max_size=1000) as cache:
+            for i in range(20):
+                cache.put(str(i), {"messages": ["x" * 100]})
+            self.assertIsNotNone(cache.get("0"))
+            cache.evict()
+            self.assertLessEqual(cache.size(), 1000)
+            # the least recently used entries are evicted first
+            self.assertIsNotNone(cache.get("0"))
+            self.assertIsNone(cache.get("1"))
+            self.assertIsNotNone(cache.get("19"))
+
+    def test_pickle(self):
+        cache = ResultCache(self.path, max_size=1000)
+        cache.put("key", {"messages": []})
+        copied_cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(copied_cache.max_size, 1000)
+        self.assertEqual(copied_cache.get("key"), {"messages": []})
+        copied_cache.close()
+        cache.close()
+
+    def test_invalid_max_size(self):
+        with self.assertRaises(ValueError):
+            ResultCache(self.path, max_size=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -57,6 +57,22 @@ class TestResults(unittest.TestCase):
         self.assertEqual(self.results.count_warnings(), 0)
         self.assertEqual(self.results._results, {})
     
+    def test_replace_messages_by_reaction(self):
+        self.results.add_message("r1", 1, "message")
+        self.results.add_message("r3", 2, "message", is_warning=False)
+        error = {"code": 2, "message": "new message", "is_warning": False}
+        self.results.replace_messages_by_reaction("r1", [error])
+        self.assertEqual(list(self.results._results.items()), [("r1", [error]), ("r3", [{"code": 2, "message": "message", "is_warning": False}])])
+        self.assertEqual(self.results.count_errors(), 2)
+        self.assertEqual(self.results.count_warnings(), 0)
+        # a reaction without messages so far is placed before the reactions after it
+        self.results.replace_messages_by_reaction("r2", [error], ["r3", "r4"])
+        self.assertEqual(list(self.results._results.keys()), ["r1", "r2", "r3"])
+        self.assertEqual(self.results.count_errors(), 3)
+        self.results.replace_messages_by_reaction("r2", [])
+        self.assertEqual(list(self.results._results.keys()), ["r1", "r3"])
+        self.assertEqual(self.results.count_errors(), 2)
+
     def test_count_messages(self):
         self.results.add_message("reaction_name", 1, "message")
         self.results.add_message("reaction_name", 2, "message", is_warning=False)
@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import time
+# setting path
+current_dir = os.path.dirname(__file__)
+parent_dir = os.path.dirname(current_dir)
+common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
+sys.path.append(common_dir)
+
+from analyzer import Analyzer
+from sandbox import Sandbox, simplify_kinetics, resource
+from common.util import RateLawTimeout
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_MODELS = "test_models"
+
+FALSE_PATH_1002 = os.path.join(DIR, TEST_MODELS, "false_1002.ant")
+REVERSIBLE_MM_PATH = os.path.join(DIR, TEST_MODELS, "reversible_MM.json")
+
+class TestSandbox(unittest.TestCase):
+
+    def test_run(self):
+        with Sandbox() as sandbox:
+            self.assertEqual(str(sandbox.run(simplify_kinetics, "k1*a*b/b", ["k1", "a", "b"])), "a*k1")
+            self.assertIsNone(sandbox.run(simplify_kinetics, "k1*(", ["k1"]))
+            with self.assertRaises(RuntimeError):
+                sandbox.run(int, "k1")
+            self.assertEqual(str(sandbox.run(simplify_kinetics, "k1 + k1", ["k1"])), "2*k1")
+
+    def test_time_limit(self):
+        with Sandbox(time_limit=0.5) as sandbox:
+            start = time.monotonic()
+            with self.assertRaises(RateLawTimeout):
+                sandbox.run(time.sleep, 60)
+            self.assertLess(time.monotonic() - start, 30)
+            # a new worker takes over
+            self.assertEqual(str(sandbox.run(simplify_kinetics, "k1*a*b/b", ["k1", "a", "b"])), "a*k1")
+
+    @unittest.skipIf(resource is None, "memory limits are not supported on this platform")
+    def test_memory_limit(self):
+        with Sandbox(memory_limit=4 * 1024 ** 3) as sandbox:
+            with self.assertRaises(RateLawTimeout):
+                sandbox.run(bytearray, 8 * 1024 ** 3)
+            self.assertEqual(str(sandbox.run(simplify_kinetics, "k1*a*b/b", ["k1", "a", "b"])), "a*k1")
+
+    def test_recycle(self):
+        with Sandbox(max_tasks_per_worker=2) as sandbox:
+            sandbox.run(os.getpid)
+            pid = sandbox.run(os.getpid)
+            self.assertNotEqual(sandbox.run(os.getpid), pid)
+
+    def test_analyzer(self):
+        analyzer = Analyzer(FALSE_PATH_1002, REVERSIBLE_MM_PATH)
+        analyzer.checks([1002])
+        with Sandbox() as sandbox:
+            sandbox_analyzer = Analyzer(FALSE_PATH_1002, REVERSIBLE_MM_PATH, sandbox=sandbox)
+            sandbox_analyzer.checks([1002])
+        self.assertEqual(str(sandbox_analyzer.results), str(analyzer.results))
+        self.assertEqual(sandbox_analyzer.data.default_classifications, analyzer.data.default_classifications)
+        self.assertEqual(sandbox_analyzer.data.custom_classifications, analyzer.data.custom_classifications)
+
+if __name__ == "__main__":
+    unittest.main()
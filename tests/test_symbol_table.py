@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+# setting path
+current_dir = os.path.dirname(__file__)
+parent_dir = os.path.dirname(current_dir)
+common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
+sys.path.append(common_dir)
+
+from symbol_table import SymbolTable, SPECIES, PARAMETER, COMPARTMENT, LOCAL_PARAMETER
+
+import libsbml
+
+def make_model():
+    document = libsbml.SBMLDocument(3, 1)
+    model = document.createModel()
+    compartment = model.createCompartment()
+    compartment.setId("c")
+    compartment.setConstant(True)
+    for species_id, is_boundary in [("a", False), ("b", True)]:
+        species = model.createSpecies()
+        species.setId(species_id)
+        species.setCompartment("c")
+        species.setBoundaryCondition(is_boundary)
+        species.setConstant(False)
+    for parameter_id, is_constant in [("k1", True), ("k2", False)]:
+        parameter = model.createParameter()
+        parameter.setId(parameter_id)
+        parameter.setConstant(is_constant)
+    reaction = model.createReaction()
+    reaction.setId("r1")
+    kinetic_law = reaction.createKineticLaw()
+    local_parameter = kinetic_law.createLocalParameter()
+    local_parameter.setId("k2")
+    kinetic_law.setMath(libsbml.parseL3Formula("k2*a"))
+    return document
+
+class TestSymbolTable(unittest.TestCase):
+
+    def test_lookup(self):
+        document = make_model()
+        table = SymbolTable(document.getModel())
+        self.assertEqual(table.lookup("c").kind, COMPARTMENT)
+        self.assertEqual(table.lookup("a").kind, SPECIES)
+        self.assertEqual(table.lookup("k1").kind, PARAMETER)
+        self.assertIsNone(table.lookup("x"))
+        # the local parameter shadows the global one in its reaction only
+        self.assertEqual(table.lookup("k2").kind, PARAMETER)
+        self.assertFalse(table.lookup("k2").is_constant)
+        self.assertEqual(table.lookup("k2", "r1").kind, LOCAL_PARAMETER)
+        self.assertTrue(table.lookup("k2", "r1").is_constant)
+        self.assertEqual(table.lookup("k2", "r1").reaction_id, "r1")
+        self.assertEqual(table.lookup("k1", "r1").kind, PARAMETER)
+
+    def test_is_boundary_species(self):
+        document = make_model()
+        table = SymbolTable(document.getModel())
+        self.assertFalse(table.is_boundary_species("a"))
+        self.assertTrue(table.is_boundary_species("b"))
+        self.assertFalse(table.is_boundary_species("k1"))
+        self.assertFalse(table.is_boundary_species("x"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,7 +8,7 @@ parent_dir = os.path.dirname(current_dir)
 common_dir = os.path.join(parent_dir, 'ratesb_python', 'common')
 sys.path.append(common_dir)
 
-from util import get_model_str, get_json_str, check_equal, check_kinetics_derivative, add_underscore_to_ids, remove_underscore_from_ids
+from util import get_model_str, get_json_str, check_equal, check_kinetics_derivative, add_underscore_to_ids, remove_underscore_from_ids, fingerprint, CompiledExpression, time_limit, RateLawTimeout
 
 class TestUtil(unittest.TestCase):
     def test_get_model_str(self):
@@ -68,6 +68,32 @@ class TestUtil(unittest.TestCase):
         self.assertFalse(check_equal(expr5, expr7))
         self.assertFalse(check_equal(expr6, expr7))
     
+    def test_fingerprint(self):
+        x, y, z = sp.symbols('x y z')
+        self.assertEqual(fingerprint(CompiledExpression(x * (y + z))), fingerprint(CompiledExpression(x * y + z * x)))
+        self.assertEqual(fingerprint(CompiledExpression(x / x)), fingerprint(CompiledExpression(sp.Integer(1))))
+        self.assertNotEqual(fingerprint(CompiledExpression(x * y)), fingerprint(CompiledExpression(x * z)))
+        self.assertNotEqual(fingerprint(CompiledExpression(x + y)), fingerprint(CompiledExpression(x + 1.1 * y)))
+        self.assertIsNone(fingerprint(CompiledExpression(sp.sqrt(-x))))
+        self.assertIsNone(fingerprint(CompiledExpression(sp.log(x - 10))))
+
+    def test_time_limit(self):
+        with time_limit(None):
+            pass
+        with time_limit(10):
+            pass
+        with self.assertRaises(RateLawTimeout):
+            with time_limit(0.01):
+                while True:
+                    pass
+        # the outer limit still applies after an inner block
+        with self.assertRaises(RateLawTimeout):
+            with time_limit(0.05):
+                with time_limit(10):
+                    pass
+                while True:
+                    pass
+    
     def test_check_kinetics_derivative(self):
         expr1 = "x + y + z"
         expr2 = "x + z - 2 * y"
@@ -86,6 +112,11 @@ class TestUtil(unittest.TestCase):
         self.assertFalse(check_kinetics_derivative(expr4, symbols, symbols, False))
         self.assertTrue(check_kinetics_derivative(expr5, symbols, ["x", "y"]))
         self.assertFalse(check_kinetics_derivative(expr5, symbols, ["x", "y"], False))
+        # the ids are not replaced inside each other
+        self.assertTrue(check_kinetics_derivative("xx * x", ["x", "xx"], ["x", "xx"]))
+        self.assertTrue(check_kinetics_derivative("x", symbols, []))
+        with self.assertRaises(ValueError):
+            check_kinetics_derivative("log(x - 5)", symbols, ["x"])
     
     def test_add_underscore_to_ids(self):
         ids_list = ["x", "y", "z"]